@@ -0,0 +1,209 @@
+import os
+import time
+import shutil
+import fnmatch
+import hashlib
+import tarfile
+import zipfile
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Paths dropped before an archive scan, matched against "/" + the member path
+DEFAULT_EXCLUDES = [
+    "*/test/*", "*/tests/*", "*/__tests__/*", "*/testdata/*", "*/spec/*",
+    "*/doc/*", "*/docs/*", "*/examples/*",
+    "*.md", "*.rst", "*.map",
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.svg", "*.ico", "*.bmp", "*.webp",
+    "*.woff", "*.woff2", "*.ttf", "*.eot", "*.otf",
+    "*.mp4", "*.mp3", "*.wav", "*.pdf",
+    "*/.git/*", "*/.idea/*", "*/.vscode/*", "*/__pycache__/*",
+]
+
+# Members that are already compressed are stored as is instead of being deflated again
+STORED_EXTENSIONS = {
+    ".jar", ".war", ".ear", ".aar", ".apk", ".zip", ".whl", ".egg", ".nupkg",
+    ".gz", ".tgz", ".bz2", ".xz", ".zst", ".7z", ".rar",
+}
+
+# Only bundled binaries and big files are deduplicated (the same library copied to several
+# paths). Small files such as an empty __init__.py, lockfiles or configs are often identical
+# at different paths but matter where they are, they are always kept
+DEDUP_EXTENSIONS = {
+    ".jar", ".war", ".ear", ".aar", ".apk", ".whl", ".egg", ".nupkg",
+    ".dll", ".so", ".dylib", ".exe", ".node", ".a", ".lib",
+}
+DEDUP_MIN_SIZE = 4 * 1024 * 1024
+
+CHUNK_SIZE = 1024 * 1024
+
+# Tar members bigger than this are spooled to disk while they are hashed
+SPOOL_SIZE = 8 * 1024 * 1024
+
+def load_excludes(patterns=None, exclude_file=None, defaults=True):
+    """
+    Exclude rules: the defaults, the given patterns and the lines of the exclude file
+    (blank lines and # comments are ignored).
+    """
+    excludes = list(DEFAULT_EXCLUDES) if defaults else []
+    excludes.extend(patterns or [])
+    if exclude_file:
+        with open(exclude_file, "r") as f:
+            excludes.extend(line.strip() for line in f if line.strip() and not line.lstrip().startswith("#"))
+    return excludes
+
+def is_dedup_candidate(name, size):
+    """Whether a member may be dropped when another one has the same content."""
+    if size == 0:
+        return False
+    base = os.path.basename(name).lower()
+    # Versioned shared libraries: libssl.so.3
+    return (size >= DEDUP_MIN_SIZE or os.path.splitext(base)[1] in DEDUP_EXTENSIONS
+            or ".so." in base)
+
+def is_excluded(path, excludes):
+    path = "/" + path.lstrip("/")
+    return any(fnmatch.fnmatchcase(path, pattern) for pattern in excludes)
+
+class SlimResult:
+    """
+    What the pre-processing kept and dropped, sizes are uncompressed member bytes.
+    """
+    __slots__ = ("files_in", "files_out", "excluded", "duplicates", "bytes_in", "bytes_out", "archive_in", "archive_out")
+
+    def __init__(self):
+        self.files_in = self.files_out = self.excluded = self.duplicates = 0
+        self.bytes_in = self.bytes_out = self.archive_in = self.archive_out = 0
+
+    def summary(self):
+        saved = self.bytes_in - self.bytes_out
+        percent = saved * 100 / self.bytes_in if self.bytes_in else 0
+        return (f"Slimmed archive: {self.files_out}/{self.files_in} files kept "
+                f"({self.excluded} excluded, {self.duplicates} duplicates), "
+                f"{saved / 1048576:.1f} MB of content saved ({percent:.0f}%), "
+                f"archive {self.archive_in / 1048576:.1f} MB -> {self.archive_out / 1048576:.1f} MB")
+
+def _output_info(name, date_time, mode=None):
+    info = zipfile.ZipInfo(name, date_time)
+    if mode:
+        info.external_attr = (mode & 0xFFFF) << 16
+    extension = os.path.splitext(name)[1].lower()
+    info.compress_type = zipfile.ZIP_STORED if extension in STORED_EXTENSIONS else zipfile.ZIP_DEFLATED
+    return info
+
+def _slim_zip(source, zout, excludes, result, workers):
+    with zipfile.ZipFile(source) as zin:
+        members = [info for info in zin.infolist() if not info.is_dir()]
+        result.files_in = len(members)
+        result.bytes_in = sum(info.file_size for info in members)
+        kept = [info for info in members if not is_excluded(info.filename, excludes)]
+        result.excluded = len(members) - len(kept)
+
+        # Members are hashed in parallel, each thread reads through its own handle
+        local = threading.local()
+        handles = []
+
+        def digest(info):
+            if not hasattr(local, "zip"):
+                local.zip = zipfile.ZipFile(source)
+                handles.append(local.zip)
+            h = hashlib.sha256()
+            with local.zip.open(info) as f:
+                for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                    h.update(chunk)
+            return h.hexdigest()
+
+        candidates = [info for info in kept if is_dedup_candidate(info.filename, info.file_size)]
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                digests = dict(zip(candidates, executor.map(digest, candidates)))
+        finally:
+            for handle in handles:
+                handle.close()
+
+        seen = set()
+        for info in kept:
+            member_digest = digests.get(info)
+            if member_digest is not None:
+                if member_digest in seen:
+                    result.duplicates += 1
+                    continue
+                seen.add(member_digest)
+            out_info = _output_info(info.filename, info.date_time)
+            out_info.external_attr = info.external_attr
+            with zin.open(info) as src, zout.open(out_info, "w", force_zip64=info.file_size > 0x7FFFFFFF) as dst:
+                shutil.copyfileobj(src, dst, CHUNK_SIZE)
+            result.files_out += 1
+            result.bytes_out += info.file_size
+
+def _slim_tar(source, zout, excludes, result):
+    # Compressed tars can only be read in order, members are hashed while they are spooled
+    seen = set()
+    with tarfile.open(source, "r|*") as tin:
+        for member in tin:
+            if not member.isfile():
+                continue
+            result.files_in += 1
+            result.bytes_in += member.size
+            if is_excluded(member.name, excludes):
+                result.excluded += 1
+                continue
+
+            out_info = _output_info(member.name, _date_time(member.mtime), member.mode | 0o100000)
+            src = tin.extractfile(member)
+            if not is_dedup_candidate(member.name, member.size):
+                with zout.open(out_info, "w", force_zip64=member.size > 0x7FFFFFFF) as dst:
+                    shutil.copyfileobj(src, dst, CHUNK_SIZE)
+                result.files_out += 1
+                result.bytes_out += member.size
+                continue
+
+            h = hashlib.sha256()
+            with tempfile.SpooledTemporaryFile(max_size=SPOOL_SIZE) as spool:
+                for chunk in iter(lambda: src.read(CHUNK_SIZE), b""):
+                    h.update(chunk)
+                    spool.write(chunk)
+                member_digest = h.hexdigest()
+                if member_digest in seen:
+                    result.duplicates += 1
+                    continue
+                seen.add(member_digest)
+                spool.seek(0)
+                with zout.open(out_info, "w", force_zip64=member.size > 0x7FFFFFFF) as dst:
+                    shutil.copyfileobj(spool, dst, CHUNK_SIZE)
+            result.files_out += 1
+            result.bytes_out += member.size
+
+def _date_time(mtime):
+    # Zip timestamps start in 1980
+    return max(time.localtime(mtime)[:6], (1980, 1, 1, 0, 0, 0))
+
+def slim_archive(source, output_file, excludes, workers=None):
+    """
+    Stream through a zip or tar (gz, bz2, xz) archive and repack it into a zip without
+    the members matching the exclude rules and without duplicate copies of bundled
+    binaries and big files.
+    Returns a SlimResult, or None if the source is not a supported archive.
+    """
+    if zipfile.is_zipfile(source):
+        kind = "zip"
+    elif tarfile.is_tarfile(source):
+        kind = "tar"
+    else:
+        return None
+
+    result = SlimResult()
+    result.archive_in = os.path.getsize(source)
+    try:
+        with zipfile.ZipFile(output_file, "w", allowZip64=True) as zout:
+            if kind == "zip":
+                _slim_zip(source, zout, excludes, result, workers or min(8, os.cpu_count() or 1))
+            else:
+                _slim_tar(source, zout, excludes, result)
+    except (zipfile.BadZipFile, tarfile.TarError, OSError, EOFError) as e:
+        print(f"Could not pre-process {source}: {e}")
+        if os.path.exists(output_file):
+            os.remove(output_file)
+        return None
+    result.archive_out = os.path.getsize(output_file)
+    return result
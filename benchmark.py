@@ -0,0 +1,293 @@
+import os
+import sys
+import json
+import time
+import random
+import pickle
+import argparse
+import functools
+import tempfile
+import statistics
+import subprocess
+import tracemalloc
+import multiprocessing
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, peak RSS is then reported as None
+    resource = None
+
+SEVERITIES = ["Critical", "High", "Medium", "Low"]
+RISK_RATINGS = ["0", "2", "3", "4"]
+LICENSES = [
+    ("MIT License", "MIT", "https://spdx.org/licenses/MIT.html"),
+    ("Apache License 2.0", "Apache-2.0", "https://spdx.org/licenses/Apache-2.0.html"),
+    ("GNU General Public License v3.0", "GPL-3.0", "https://spdx.org/licenses/GPL-3.0.html"),
+    ("BSD 3-Clause License", "BSD-3-Clause", "https://spdx.org/licenses/BSD-3-Clause.html"),
+    ("Unknown License", "", ""),
+]
+
+def generate_table_output(path, findings, seed=0):
+    """Writes a synthetic Veracode table output with the given number of vulnerabilities."""
+    rng = random.Random(seed)
+    with open(path, "w") as f:
+        f.write("Scanning synthetic-source\n\nVulnerabilities\n")
+        f.write("NAME                INSTALLED  FIXED-IN  TYPE          VULNERABILITY        SEVERITY\n")
+        for i in range(findings):
+            package = f"package-{rng.randrange(findings // 10 + 1)}"
+            severity = rng.choice(SEVERITIES)
+            # About a third of the rows have no fixed version
+            if rng.random() < 0.3:
+                f.write(f"{package}  1.{i % 50}.0             java-archive  GHSA-{i:04x}-abcd-efgh  {severity}\n")
+            else:
+                f.write(f"{package}  1.{i % 50}.0  1.{i % 50}.1  java-archive  CVE-2024-{i:06d}       {severity}\n")
+        f.write("\n\nNo misconfigurations found\n\nNo secrets found\n\nPolicy Results\nPassed\n")
+
+def generate_detailed_report(path, findings, seed=0):
+    """Writes a synthetic detailed report XML with the given number of license findings."""
+    rng = random.Random(seed)
+    with open(path, "w") as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n')
+        f.write('<detailedreport xmlns="https://www.veracode.com/schema/reports/export/1.0" '
+                'app_name="Benchmark App" sandbox_name="Benchmark Sandbox" version="1.0">\n')
+        f.write('<static-analysis rating="A" score="90"/>\n')
+        f.write('<software_composition_analysis><vulnerable_components>\n')
+        written = 0
+        component = 0
+        while written < findings:
+            licenses = min(rng.randint(1, 3), findings - written)
+            f.write(f'<component component_id="{component}" file_name="library-{component}.jar" '
+                    f'library="library-{component}" version="1.0.{component % 100}"><licenses>\n')
+            for _ in range(licenses):
+                name, spdx_id, url = rng.choice(LICENSES)
+                f.write(f'<license name="{name}" spdx_id="{spdx_id}" license_url="{url}" '
+                        f'risk_rating="{rng.choice(RISK_RATINGS)}"/>\n')
+            f.write('</licenses><vulnerabilities/></component>\n')
+            written += licenses
+            component += 1
+        f.write('</vulnerable_components></software_composition_analysis>\n</detailedreport>\n')
+
+def _setup(benchmark, input_file, workdir, args_file):
+    """
+    Builds the arguments of the benchmarked call in its own process and pickles them,
+    the peak RSS of the setup (parsing the input) is then not part of the measurement.
+    """
+    sys.stdout = open(os.devnull, "w")
+    import license
+    import veracli
+
+    if benchmark in ("export_to_excel", "export_to_excel_streaming"):
+        args = (license.extract_license(input_file), os.path.join(workdir, "licenses.xlsx"))
+    elif benchmark == "save_html":
+        args = (veracli.parse_to_html(input_file), os.path.join(workdir, "report.html"))
+    else:
+        args = (input_file,)
+    with open(args_file, "wb") as f:
+        pickle.dump(args, f, pickle.HIGHEST_PROTOCOL)
+
+def _target(benchmark):
+    """The function measured by a benchmark."""
+    import license
+    import veracli
+
+    return {
+        "extract_license": license.extract_license,
+        "export_to_excel": license.export_to_excel,
+        "export_to_excel_streaming": functools.partial(license.export_to_excel, streaming=True),
+        "parse_to_html": veracli.parse_to_html,
+        "save_html": veracli.save_html,
+    }[benchmark]
+
+def _peak_rss_kb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+def _measure(benchmark, args_file, trace, queue):
+    """Runs one benchmark in its own process so peak RSS is not shared between runs."""
+    # Keep the progress messages of the tools out of the results
+    sys.stdout = open(os.devnull, "w")
+    func = _target(benchmark)
+    with open(args_file, "rb") as f:
+        args = pickle.load(f)
+    # Interpreter, imports and the unpickled arguments, the rest of the peak is the call
+    input_rss_kb = _peak_rss_kb()
+
+    # tracemalloc slows allocation heavy code down a lot, so it is opt-in
+    if trace:
+        tracemalloc.start()
+    cpu_start = time.process_time()
+    start = time.perf_counter()
+    func(*args)
+    seconds = time.perf_counter() - start
+    cpu_seconds = time.process_time() - cpu_start
+    traced_peak = None
+    if trace:
+        traced_peak = tracemalloc.get_traced_memory()[1] // 1024
+        tracemalloc.stop()
+
+    queue.put({
+        "seconds": round(seconds, 4),
+        "cpu_seconds": round(cpu_seconds, 4),
+        "peak_rss_kb": _peak_rss_kb(),
+        "input_rss_kb": input_rss_kb,
+        "peak_traced_kb": traced_peak,
+    })
+
+def run_benchmark(benchmark, input_file, workdir, trace=False):
+    ctx = multiprocessing.get_context("spawn")
+    args_file = os.path.join(workdir, f"{benchmark}.args.pickle")
+    try:
+        setup = ctx.Process(target=_setup, args=(benchmark, input_file, workdir, args_file))
+        setup.start()
+        setup.join()
+        if setup.exitcode != 0:
+            raise RuntimeError(f"{benchmark} setup failed with exit code {setup.exitcode}")
+
+        queue = ctx.Queue()
+        process = ctx.Process(target=_measure, args=(benchmark, args_file, trace, queue))
+        process.start()
+        process.join()
+        if process.exitcode != 0:
+            raise RuntimeError(f"{benchmark} failed with exit code {process.exitcode}")
+        return queue.get()
+    finally:
+        if os.path.exists(args_file):
+            os.remove(args_file)
+
+BENCHMARKS = {
+    "extract_license": "xml",
+    "export_to_excel": "xml",
+    "export_to_excel_streaming": "xml",
+    "parse_to_html": "table",
+    "save_html": "table",
+}
+
+# Import time budget of the vera entry point, checked with --startup
+STARTUP_BUDGET_MS = 200
+
+STARTUP_COMMANDS = ["scan", "license"]
+
+def import_time_ms(stderr):
+    """Sums the top level entries of a `python -X importtime` log."""
+    total = 0
+    for line in stderr.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        _, cumulative, name = line.split("|")
+        # Nested imports are indented, their time is already in their parent
+        if cumulative.strip().isdigit() and not name.startswith("   "):
+            total += int(cumulative)
+    return total / 1000
+
+def measure_startup(command, runs=5):
+    """Median wall and import time of `vera.py <command> --help` over a few fresh interpreters."""
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), "vera.py")
+    walls, imports = [], []
+    modules = set()
+    for _ in range(runs):
+        start = time.perf_counter()
+        completed = subprocess.run([sys.executable, "-X", "importtime", script, command, "--help"],
+                                   capture_output=True, text=True, check=True)
+        walls.append((time.perf_counter() - start) * 1000)
+        imports.append(import_time_ms(completed.stderr))
+        modules.update(line.split("|")[2].strip() for line in completed.stderr.splitlines() if line.count("|") == 2)
+    return {
+        "command": command,
+        "wall_ms": round(statistics.median(walls), 1),
+        "import_ms": round(statistics.median(imports), 1),
+        # Heavy packages that must stay out of the startup path
+        "heavy_imports": sorted(m for m in modules if m.split(".")[0] in ("openpyxl", "PIL", "lxml", "bs4")),
+    }
+
+def compare(results, baseline_file, tolerance):
+    """Returns the list of regressions against a previous results file."""
+    with open(baseline_file, "r") as f:
+        baseline = {(r["benchmark"], r["size"]): r for r in json.load(f)["results"]}
+
+    regressions = []
+    for result in results:
+        previous = baseline.get((result["benchmark"], result["size"]))
+        if not previous:
+            continue
+        for metric in ("seconds", "peak_rss_kb"):
+            if result[metric] and previous.get(metric) and result[metric] > previous[metric] * (1 + tolerance):
+                regressions.append(f"{result['benchmark']} size={result['size']} {metric}: "
+                                   f"{previous[metric]} -> {result[metric]}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark veracli and verareport on synthetic reports.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000], help="Number of findings per input")
+    parser.add_argument("--benchmarks", nargs="+", choices=list(BENCHMARKS), default=list(BENCHMARKS), help="Benchmarks to run")
+    parser.add_argument("-o", "--output", default="bench_results.json", help="JSON file for the results")
+    parser.add_argument("--baseline", help="Previous results file, exit with an error on regressions")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="Allowed slowdown/growth against the baseline (0.2 = 20%%)")
+    parser.add_argument("--keep", metavar="DIR", help="Keep the generated inputs in this folder")
+    parser.add_argument("--tracemalloc", action="store_true", help="Also record the peak of Python allocations (slower)")
+    parser.add_argument("--startup", action="store_true", help="Only measure the start up time of vera.py and check it against the budget")
+    parser.add_argument("--startup-budget", type=float, default=STARTUP_BUDGET_MS, help="Import time budget in ms (default: %(default)s)")
+    args = parser.parse_args()
+
+    if args.startup:
+        over_budget = False
+        for command in STARTUP_COMMANDS:
+            result = measure_startup(command)
+            print(f"vera {command:<8} --help  wall {result['wall_ms']:>7.1f} ms  imports {result['import_ms']:>7.1f} ms")
+            if result["import_ms"] > args.startup_budget:
+                print(f"Over budget: vera {command} imports take {result['import_ms']} ms (budget {args.startup_budget} ms)")
+                over_budget = True
+            if result["heavy_imports"]:
+                print(f"Heavy modules imported at start up by vera {command}: {', '.join(result['heavy_imports'][:5])}")
+                over_budget = True
+        sys.exit(1 if over_budget else 0)
+
+    workdir = args.keep or tempfile.mkdtemp(prefix="veracli_bench_")
+    os.makedirs(workdir, exist_ok=True)
+
+    results = []
+    for size in args.sizes:
+        inputs = {
+            "xml": os.path.join(workdir, f"detailedreport_{size}.xml"),
+            "table": os.path.join(workdir, f"scan_output_{size}.txt"),
+        }
+        needed = {BENCHMARKS[benchmark] for benchmark in args.benchmarks}
+        if "xml" in needed and not os.path.exists(inputs["xml"]):
+            generate_detailed_report(inputs["xml"], size)
+        if "table" in needed and not os.path.exists(inputs["table"]):
+            generate_table_output(inputs["table"], size)
+
+        for benchmark in args.benchmarks:
+            input_file = inputs[BENCHMARKS[benchmark]]
+            result = {"benchmark": benchmark, "size": size, "input_bytes": os.path.getsize(input_file)}
+            result.update(run_benchmark(benchmark, input_file, workdir, args.tracemalloc))
+            results.append(result)
+            print(f"{benchmark:<26} {size:>8} findings  {result['seconds']:>9.3f}s  "
+                  f"cpu {result['cpu_seconds']:>9.3f}s  peak rss {result['peak_rss_kb']} KB "
+                  f"(input {result['input_rss_kb']} KB)")
+
+    with open(args.output, "w") as f:
+        json.dump({
+            "python": sys.version.split()[0],
+            "platform": sys.platform,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "results": results,
+        }, f, indent=2)
+    print(f"Benchmark results saved to {args.output}")
+
+    if not args.keep:
+        for name in os.listdir(workdir):
+            os.remove(os.path.join(workdir, name))
+        os.rmdir(workdir)
+
+    if args.baseline:
+        regressions = compare(results, args.baseline, args.tolerance)
+        for regression in regressions:
+            print(f"Regression: {regression}")
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
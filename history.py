@@ -0,0 +1,250 @@
+import os
+import sys
+import time
+import argparse
+import sqlite3
+from veracore import RISK_RATING, SEVERITY, RiskRating, Severity, default_history_file
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS scans (
+    id INTEGER PRIMARY KEY,
+    tool TEXT NOT NULL,
+    app_name TEXT NOT NULL,
+    sandbox_name TEXT NOT NULL,
+    version TEXT NOT NULL,
+    source TEXT,
+    stored_at TEXT NOT NULL,
+    UNIQUE (tool, app_name, sandbox_name, version)
+);
+CREATE TABLE IF NOT EXISTS vulnerabilities (
+    scan_id INTEGER NOT NULL REFERENCES scans(id) ON DELETE CASCADE,
+    component TEXT,
+    installed TEXT,
+    fixed_in TEXT,
+    type TEXT,
+    vulnerability TEXT,
+    severity INTEGER
+);
+CREATE TABLE IF NOT EXISTS licenses (
+    scan_id INTEGER NOT NULL REFERENCES scans(id) ON DELETE CASCADE,
+    component TEXT,
+    license_name TEXT,
+    spdx_id TEXT,
+    license_url TEXT,
+    risk_rating INTEGER
+);
+CREATE INDEX IF NOT EXISTS vulnerabilities_scan ON vulnerabilities (scan_id);
+CREATE INDEX IF NOT EXISTS vulnerabilities_component ON vulnerabilities (component);
+CREATE INDEX IF NOT EXISTS vulnerabilities_vulnerability ON vulnerabilities (vulnerability);
+CREATE INDEX IF NOT EXISTS vulnerabilities_severity ON vulnerabilities (severity);
+CREATE INDEX IF NOT EXISTS licenses_scan ON licenses (scan_id);
+CREATE INDEX IF NOT EXISTS licenses_component ON licenses (component);
+CREATE INDEX IF NOT EXISTS licenses_license_name ON licenses (license_name);
+CREATE INDEX IF NOT EXISTS licenses_spdx_id ON licenses (spdx_id);
+CREATE INDEX IF NOT EXISTS licenses_risk_rating ON licenses (risk_rating);
+"""
+
+class FindingsStore:
+    """
+    Local SQLite history of the parsed findings, one scan per tool/app/sandbox/version.
+    Storing the same key again replaces its findings. Every call opens its own
+    connection, so worker processes and scan threads can store concurrently.
+    """
+
+    def __init__(self, db_file):
+        self.db_file = db_file
+        directory = os.path.dirname(os.path.abspath(db_file))
+        os.makedirs(directory, exist_ok=True)
+        with self.connect() as conn:
+            conn.executescript(SCHEMA)
+
+    def connect(self):
+        conn = sqlite3.connect(self.db_file, timeout=60)
+        # WAL lets queries run while another process is storing a report
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    def _replace_scan(self, conn, tool, metadata, source):
+        key = (tool, metadata.get("app_name") or "", metadata.get("sandbox_name") or "", metadata.get("version") or "")
+        conn.execute("DELETE FROM scans WHERE tool = ? AND app_name = ? AND sandbox_name = ? AND version = ?", key)
+        cursor = conn.execute(
+            "INSERT INTO scans (tool, app_name, sandbox_name, version, source, stored_at) VALUES (?, ?, ?, ?, ?, ?)",
+            key + (source, time.strftime("%Y-%m-%dT%H:%M:%S")))
+        return cursor.lastrowid
+
+    def save_licenses(self, metadata, components, source=None):
+        """
+        Store the license findings of a detailed report under its app/sandbox/version.
+        """
+        with self.connect() as conn:
+            scan_id = self._replace_scan(conn, "verareport", metadata, source)
+            conn.executemany(
+                "INSERT INTO licenses (scan_id, component, license_name, spdx_id, license_url, risk_rating) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                ((scan_id,) + tuple(component) for component in components))
+        return scan_id
+
+    def record_licenses(self, metadata, components, source=None):
+        """
+        Pass the license findings through unchanged while collecting them, they are
+        written in one short transaction once every finding has been read.
+        """
+        rows = []
+        for component in components:
+            rows.append(tuple(component))
+            yield component
+
+        with self.connect() as conn:
+            scan_id = self._replace_scan(conn, "verareport", metadata, source)
+            conn.executemany(
+                "INSERT INTO licenses (scan_id, component, license_name, spdx_id, license_url, risk_rating) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                ((scan_id,) + row for row in rows))
+
+    def record_vulnerabilities(self, metadata, records, source=None):
+        """
+        Pass the (kind, Vulnerability) records through unchanged while collecting them,
+        so the report is rendered and stored from the same single pass. The rows are
+        written in one short transaction once every record has been read, concurrent
+        scans do not wait on each other's rendering. Vulnerability ids are stored
+        uppercase, as they are queried.
+        """
+        rows = []
+        for kind, record in records:
+            name, installed, fixed_in, type, vulnerability, severity = record
+            rows.append((name, installed, fixed_in, type, (vulnerability or "").upper(), severity))
+            yield kind, record
+
+        with self.connect() as conn:
+            scan_id = self._replace_scan(conn, "veracli", metadata, source)
+            conn.executemany(
+                "INSERT INTO vulnerabilities (scan_id, component, installed, fixed_in, type, vulnerability, severity) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                ((scan_id,) + row for row in rows))
+
+    def scans(self, app=None):
+        """
+        Stored scans as (tool, app_name, sandbox_name, version, source, stored_at, findings).
+        """
+        sql = ("SELECT tool, app_name, sandbox_name, version, source, stored_at, "
+               "(SELECT COUNT(*) FROM vulnerabilities WHERE scan_id = scans.id) + "
+               "(SELECT COUNT(*) FROM licenses WHERE scan_id = scans.id) "
+               "FROM scans")
+        params = []
+        if app:
+            sql += " WHERE app_name " + match_operator(app) + " ?"
+            params.append(app)
+        with self.connect() as conn:
+            return conn.execute(sql + " ORDER BY app_name, sandbox_name, version", params).fetchall()
+
+    def query(self, component=None, vulnerability=None, license=None, severity=None, risk=None, app=None):
+        """
+        Find stored findings. Vulnerability filters (vulnerability, severity) only search the
+        scans of veracli, license filters (license, risk) only the detailed reports.
+        Returns rows of (kind, app_name, sandbox_name, version, component, detail, finding, level).
+        """
+        rows = []
+        with self.connect() as conn:
+            if license is None and risk is None:
+                where, params = conditions([
+                    (["v.component"], component),
+                    (["v.vulnerability"], vulnerability),
+                    (["v.severity"], severity),
+                    (["s.app_name"], app),
+                ])
+                for row in conn.execute(
+                        "SELECT s.app_name, s.sandbox_name, s.version, v.component, v.installed, v.vulnerability, v.severity "
+                        "FROM vulnerabilities v JOIN scans s ON s.id = v.scan_id" + where, params):
+                    rows.append(("vulnerability",) + row[:6] + (Severity.to_string(row[6]),))
+
+            if vulnerability is None and severity is None:
+                where, params = conditions([
+                    (["l.component"], component),
+                    # The license can be given by name or by SPDX id
+                    (["l.license_name", "l.spdx_id"], license),
+                    (["l.risk_rating"], risk),
+                    (["s.app_name"], app),
+                ])
+                for row in conn.execute(
+                        "SELECT s.app_name, s.sandbox_name, s.version, l.component, l.spdx_id, l.license_name, l.risk_rating "
+                        "FROM licenses l JOIN scans s ON s.id = l.scan_id" + where, params):
+                    rows.append(("license",) + row[:6] + (RiskRating.to_string(row[6]),))
+        return rows
+
+def match_operator(value):
+    # Patterns with * or ? use GLOB, plain values an exact (indexed) match
+    return "GLOB" if isinstance(value, str) and any(c in value for c in "*?[") else "="
+
+def conditions(filters):
+    """
+    Build the WHERE clause of a query from (columns, value) filters, None values are skipped
+    and a value matches if any of its columns does.
+    """
+    clauses, params = [], []
+    for columns, value in filters:
+        if value is None:
+            continue
+        operator = match_operator(value)
+        clauses.append("(" + " OR ".join(f"{column} {operator} ?" for column in columns) + ")")
+        params.extend([value] * len(columns))
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+def print_table(headers, rows):
+    widths = [len(header) for header in headers]
+    rows = [["" if value is None else str(value) for value in row] for row in rows]
+    for row in rows:
+        widths = [max(width, len(value)) for width, value in zip(widths, row)]
+    for row in [headers] + rows:
+        print("  ".join(value.ljust(width) for value, width in zip(row, widths)).rstrip())
+
+def run(args, parser):
+    if not os.path.exists(args.db):
+        print(f"Error: No findings history at {args.db}, store reports with --store first.")
+        sys.exit(1)
+    store = FindingsStore(args.db)
+
+    if args.scans:
+        print_table(["TOOL", "APP", "SANDBOX", "VERSION", "SOURCE", "STORED", "FINDINGS"], store.scans(args.app))
+        return
+
+    severity = Severity.code(args.severity) if args.severity else None
+    risk = {info["name"].lower(): code for code, info in RISK_RATING.items()}.get(args.risk.lower()) if args.risk else None
+    if not any([args.component, args.cve, args.license, args.severity, args.risk, args.app]):
+        print("Error: Missing query arguments!")
+        parser.print_help()
+        sys.exit(1)
+
+    start = time.perf_counter()
+    rows = store.query(args.component, args.cve.upper() if args.cve else None, args.license, severity, risk, args.app)
+    elapsed = (time.perf_counter() - start) * 1000
+
+    if args.apps:
+        # Only the distinct apps, e.g. "which apps ship component X"
+        print_table(["APP", "SANDBOX", "VERSION"], sorted({row[1:4] for row in rows}, key=lambda row: tuple(v or "" for v in row)))
+    else:
+        print_table(["KIND", "APP", "SANDBOX", "VERSION", "COMPONENT", "VERSION/SPDX", "FINDING", "LEVEL"], rows)
+    print(f"{len(rows)} findings in {elapsed:.1f} ms")
+
+def add_arguments(parser):
+    parser.add_argument("--db", default=default_history_file(), help="Findings history database")
+    parser.add_argument("--component", help="Component (package or file name), * and ? wildcards allowed")
+    parser.add_argument("--cve", help="Vulnerability id (CVE, GHSA...)")
+    parser.add_argument("--license", help="License name or SPDX id")
+    parser.add_argument("--severity", choices=[info["name"] for info in SEVERITY.values()], help="Vulnerability severity")
+    parser.add_argument("--risk", choices=[info["name"] for info in RISK_RATING.values()], help="License risk rating")
+    parser.add_argument("--app", help="Only this app, * and ? wildcards allowed")
+    parser.add_argument("--apps", action="store_true", help="Only list the distinct apps/sandboxes/versions of the matches")
+    parser.add_argument("--scans", action="store_true", help="List the stored scans")
+    return parser
+
+def execute(args, parser):
+    run(args, parser)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query the findings history stored by veracli and verareport.")
+    add_arguments(parser)
+    execute(parser.parse_args(argv), parser)
+
+if __name__ == "__main__":
+    main()
@@ -1,71 +1,116 @@
 import os
+import copy
 import argparse
 import sys
+import glob
+import functools
+from multiprocessing import freeze_support
 import xml.etree.ElementTree as ET
-from openpyxl import Workbook
-from openpyxl.styles import PatternFill, Font
-from openpyxl.drawing.image import Image
-from openpyxl.styles import Alignment
-from openpyxl.drawing.spreadsheet_drawing import AbsoluteAnchor
-from openpyxl.drawing.xdr import XDRPoint2D, XDRPositiveSize2D
-from openpyxl.utils.units import pixels_to_EMU
 from datetime import datetime
-
-RISK_RATING = {
-        "0": {"name": "Unassessable", "icon": "img/unassessable.png"},
-        "2": {"name": "Low", "icon": "img/low.png"},
-        "3": {"name": "Medium", "icon": "img/medium.png"},
-        "4": {"name": "High", "icon": "img/high.png"},
-        }
+from veracore import (RISK_RATING, UNKNOWN_RISK, RiskRating, LicenseFinding, metrics, instrumented, default_history_file, diff_findings,
+                      index_findings, new_at_or_above, fan_out, EXPORT_BUFFER)
 
 font_path = "font/SoleilRegular.ttf"
 
-# Define an Enum for risk_rating
-class RiskRating:
-    
-    def from_value(risk_rating_value):
-        """
-        Get the risk rating details (name and icon) based on the numeric value.
-        """
-        return RISK_RATING.get(risk_rating_value, {"name": "Unknown", "icon": None})
+NAMESPACE = "{https://www.veracode.com/schema/reports/export/1.0}"
 
-    def to_string(risk_rating_value):
-        """
-        Convert the risk rating value to a human-readable name.
-        """
-        return RISK_RATING.get(risk_rating_value, {"name": "Unknown", "icon": None})["name"]
-    
-    def get_icon(risk_rating_value):
-        """
-        Get the icon path or image associated with the risk rating value.
-        """
-        # Try to get the icon from the dictionary, or return None if it's not found
-        icon_info = RISK_RATING.get(risk_rating_value)
-        if icon_info and "icon" in icon_info:
-            return icon_info["icon"]  # Return the icon path or URL
-        else:
-            return None  # Return None if no icon is associated
+# Export formats and the extension of their output file
+LICENSE_FORMATS = {"xlsx": ".xlsx", "csv": ".csv", "jsonl": ".jsonl"}
+
+# Fields of the csv and jsonl exports
+LICENSE_FIELDS = ["file_name", "license_name", "spdx_id", "license_url", "risk_rating"]
+
+def iter_report(xml_file):
+    """
+    Stream the detailed report in a single pass.
+
+    Yields ("metadata", dict) once for the root element and then
+    ("license", dict) for every license found under
+    software_composition_analysis -> vulnerable_components -> component.
+    Every element is cleared and detached as soon as it is consumed, so
+    memory stays flat regardless of the report size.
+    """
+    # Stack of currently open elements, used to detach finished children
+    stack = []
+    component = None
+
+    for event, elem in ET.iterparse(xml_file, events=("start", "end")):
+        if event == "start":
+            if not stack:
+                # Check if we have the correct root tag with the namespace
+                if elem.tag != NAMESPACE + "detailedreport":
+                    print("Root element is not 'detailedreport'.")
+                    return
+
+                yield "metadata", {
+                    "app_name": elem.attrib.get('app_name', None),
+                    "sandbox_name": elem.attrib.get('sandbox_name', None),
+                    "version": elem.attrib.get('version', None),
+                }
+            elif (elem.tag == NAMESPACE + "component"
+                  and stack[-1].tag == NAMESPACE + "vulnerable_components"
+                  and len(stack) > 1 and stack[-2].tag == NAMESPACE + "software_composition_analysis"):
+                # Component attributes are complete on the start event
+                component = dict(elem.attrib)
+            stack.append(elem)
+            continue
+
+        stack.pop()
+        if component is not None:
+            if (elem.tag == NAMESPACE + "license"
+                  and stack[-1].tag == NAMESPACE + "licenses"
+                  and stack[-2].tag == NAMESPACE + "component"):
+                yield "license", LicenseFinding(
+                    component.get('file_name'),
+                    elem.attrib.get('name'),
+                    elem.attrib.get('spdx_id'),
+                    elem.attrib.get('license_url'),
+                    elem.attrib.get('risk_rating'),
+                )
+            elif elem.tag == NAMESPACE + "component" and stack[-1].tag == NAMESPACE + "vulnerable_components":
+                component = None
+
+        # Release the consumed element; it is always the last child of its parent
+        elem.clear()
+        if stack:
+            stack[-1].remove(elem)
 
 def extract_metada(xml_file): 
-    # Create element tree object
-    tree = ET.parse(xml_file)
+    # Only the root element is needed, stop reading right after it
+    for kind, value in iter_report(xml_file):
+        if kind == "metadata":
+            return value
+    return None
 
-    # Get the root element (which should be 'detailedreport' with a namespace)
-    root = tree.getroot()
+def read_report(xml_file):
+    """
+    Read metadata and license findings from the report with a single pass.
+    Returns (metadata, components), or (None, None) if the report is invalid.
+    """
+    metadata = None
+    components = []
+    with metrics.phase("parse", bytes=os.path.getsize(xml_file)) as frame:
+        for kind, value in iter_report(xml_file):
+            if kind == "metadata":
+                metadata = value
+                print_metadata(metadata)
+            else:
+                components.append(value)
 
-    # Check if we have the correct root tag with the namespace
-    if root.tag != '{https://www.veracode.com/schema/reports/export/1.0}detailedreport':
-        print("Root element is not 'detailedreport'.")
-        return
+        if metadata is None:
+            return None, None
 
-    # Extract the required attributes
-    metadata = {
-                "app_name": root.attrib.get('app_name', None),
-                "sandbox_name": root.attrib.get('sandbox_name', None),
-                "version": root.attrib.get('version', None),
-            }
-    
-    return metadata
+        sort_components(components)
+        frame["rows"] += len(components)
+    return metadata, components
+
+def print_metadata(metadata):
+    print("﹡﹡﹡﹡﹡﹡﹡﹡﹡﹡﹡")
+    print("﹡  LICENSE REPORT  ﹡")
+    print("﹡﹡﹡﹡﹡﹡﹡﹡﹡﹡﹡")
+    print(f"App Name: {metadata['app_name'] or 'Unknown'}")
+    print(f"Sandbox Name: {metadata['sandbox_name'] or 'Unknown'}")
+    print(f"Version: {metadata['version'] or 'Unknown'}")
     
 def generate_filename(metadata):
     # Replace blank spaces with underscores for each metadata field
@@ -81,74 +126,143 @@ def generate_filename(metadata):
     
     return filename
         
-def extract_license(xml_file): 
-    # Create element tree object
-    tree = ET.parse(xml_file)
+def license_sort_key(component):
+    # Risk rating (descending), then license name and component file name (ascending)
+    return (-component.risk_rating, component.license_name or '', component.file_name or '')
 
-    # Get the root element (which should be 'detailedreport' with a namespace)
-    root = tree.getroot()
+def sort_components(components):
+    # Risk ratings are already integers, the composite key is computed once per component
+    # and a single sort orders the list
+    components.sort(key=license_sort_key)
 
-    # Define the namespace dictionary
-    namespaces = {
-        '': 'https://www.veracode.com/schema/reports/export/1.0',  # Default namespace
-    }
+class LicenseSummary:
+    """
+    Rollups of the license findings for the summary sheet.
+    licenses: rows of (license, spdx ids, components, worst risk code)
+    risks: rows of (risk code, components, findings, licenses), a component is counted
+    under the worst risk of its licenses
+    """
+    __slots__ = ("licenses", "risks", "components", "findings")
 
-    # Check if we have the correct root tag with the namespace
-    if root.tag != '{https://www.veracode.com/schema/reports/export/1.0}detailedreport':
-        print("Root element is not 'detailedreport'.")
-        return
+    def __init__(self, licenses, risks, components, findings):
+        self.licenses = licenses
+        self.risks = risks
+        self.components = components
+        self.findings = findings
 
-    # Extract the required attributes
-    app_name = root.attrib.get('app_name', 'Unknown')
-    sandbox_name = root.attrib.get('sandbox_name', 'Unknown')
-    version = root.attrib.get('version', 'Unknown')
-    print("﹡﹡﹡﹡﹡﹡﹡﹡﹡﹡﹡")
-    print("﹡  LICENSE REPORT  ﹡")
-    print("﹡﹡﹡﹡﹡﹡﹡﹡﹡﹡﹡")
-    print(f"App Name: {app_name}")
-    print(f"Sandbox Name: {sandbox_name}")
-    print(f"Version: {version}")
-    
-    # Create empty list for components
-    components = []
+def aggregate_licenses(components):
+    """
+    Build the per-license and per-risk rollups in a single pass, grouping the findings
+    in dicts keyed by license and by component.
+    """
+    # license -> [spdx ids, component files, worst risk]
+    licenses = {}
+    # component file -> worst risk of its licenses
+    worst = {}
+    # risk -> [findings, licenses]
+    findings = {}
+    for component in components:
+        name = component.license_name or component.spdx_id or "Unknown"
+        risk = component.risk_rating
+        group = licenses.get(name)
+        if group is None:
+            group = licenses[name] = [set(), set(), risk]
+        if component.spdx_id:
+            group[0].add(component.spdx_id)
+        group[1].add(component.file_name)
+        if risk > group[2]:
+            group[2] = risk
+        if risk > worst.get(component.file_name, UNKNOWN_RISK - 1):
+            worst[component.file_name] = risk
+        by_risk = findings.get(risk)
+        if by_risk is None:
+            by_risk = findings[risk] = [0, set()]
+        by_risk[0] += 1
+        by_risk[1].add(name)
 
-    # Find the 'software_composition_analysis' -> 'vulnerable_components' -> 'component' elements
-    software_composition_analysis = root.find(".//{https://www.veracode.com/schema/reports/export/1.0}software_composition_analysis", namespaces)
-    if software_composition_analysis is not None:
-        vulnerable_components = software_composition_analysis.find("{https://www.veracode.com/schema/reports/export/1.0}vulnerable_components", namespaces)
-        if vulnerable_components is not None:
-            # Iterate through each 'component' inside 'vulnerable_components'
-            for component in vulnerable_components.findall("{https://www.veracode.com/schema/reports/export/1.0}component", namespaces):
-                # For each component, get license details
-                licenses = component.find("{https://www.veracode.com/schema/reports/export/1.0}licenses", namespaces)
-                if licenses is not None:
-                    for license in licenses.findall("{https://www.veracode.com/schema/reports/export/1.0}license", namespaces):
-                        # Extract license info from each license tag
-                        risk_rating_value = str(license.attrib.get('risk_rating'))
-                        
-                        # Extract license info from each license tag
-                        license_info = {
-                            "file_name": component.attrib.get('file_name'),
-                            "license_name": license.attrib.get('name'),
-                            "spdx_id": license.attrib.get('spdx_id'),
-                            "license_url": license.attrib.get('license_url'),
-                            "risk_rating": risk_rating_value
-                        }
-                        components.append(license_info)  # Add license info to the list
-
-    # # Sort the components list by risk_rating in descending order
-    # components.sort(key=lambda x: int(x['risk_rating']) if x['risk_rating'].isdigit() else -1, reverse=True)
-    
-     # Sort the components list first by risk_rating (descending), then by license_name (ascending)
-    components.sort(key=lambda x: (int(x['risk_rating']) if x['risk_rating'].isdigit() else -1, x['license_name'] or ''))  # Second criterion: license_name, empty string if None
-    # Sort in descending order for risk_rating, ascending order for license_name
-    components.sort(key=lambda x: int(x['risk_rating']) if x['risk_rating'].isdigit() else -1, reverse=True)
+    per_component = {}
+    for risk in worst.values():
+        per_component[risk] = per_component.get(risk, 0) + 1
+
+    license_rows = [(name, ", ".join(sorted(spdx_ids)), len(files), risk)
+                    for name, (spdx_ids, files, risk) in licenses.items()]
+    # Worst risk first, then the most used licenses
+    license_rows.sort(key=lambda row: (-row[3], -row[2], row[0]))
+    risk_rows = [(risk, per_component.get(risk, 0), count, len(names))
+                 for risk, (count, names) in sorted(findings.items(), reverse=True)]
+    return LicenseSummary(license_rows, risk_rows, len(worst), sum(row[2] for row in risk_rows))
+
+def write_summary_sheet(ws, summary):
+    """
+    Write the per-risk and per-license rollups, works for regular and write-only worksheets.
+    """
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+    from openpyxl.utils import get_column_letter
+
+    bold = Font(bold=True)
+
+    def header(*values):
+        cells = []
+        for value in values:
+            cell = WriteOnlyCell(ws, value=value)
+            cell.font = bold
+            cells.append(cell)
+        return cells
+
+    # Widths must be set before the first row of a write-only sheet
+    widths = [len("License findings"), len("Components (worst risk)"), len("Components"), len("Worst Risk")]
+    for name, spdx_ids, _, _ in summary.licenses:
+        widths[0] = max(widths[0], len(name))
+        widths[1] = max(widths[1], len(spdx_ids))
+    for col, width in enumerate(widths, start=1):
+        ws.column_dimensions[get_column_letter(col)].width = min(width, 80) + 2
+
+    ws.append(header("Components", summary.components))
+    ws.append(header("License findings", summary.findings))
+    ws.append([])
+    ws.append(header("Risk", "Components (worst risk)", "Findings", "Licenses"))
+    for risk, component_count, finding_count, license_count in summary.risks:
+        ws.append([RiskRating.to_string(risk), component_count, finding_count, license_count])
+    ws.append([])
+    ws.append(header("License", "SPDX IDs", "Components", "Worst Risk"))
+    for name, spdx_ids, component_count, risk in summary.licenses:
+        ws.append([name, spdx_ids, component_count, RiskRating.to_string(risk)])
+
+def extract_license(xml_file): 
+    metadata, components = read_report(xml_file)
 
     # Check if we found any components with license info and print them
     return components
 
 
-def export_to_excel(components, output_file='licenses.xlsx'):
+def export_to_excel(components, output_file='licenses.xlsx', streaming=False, icons=None):
+    # icons: None keeps the exporter's default, drawn in the default workbook and off when streaming
+    if streaming:
+        return export_to_excel_streaming(components, output_file, bool(icons))
+
+    with metrics.phase("aggregate", rows=len(components)):
+        summary = aggregate_licenses(components)
+    with metrics.phase("render", rows=len(components)):
+        wb = build_workbook(components, icons is not False)
+        write_summary_sheet(wb.create_sheet('Summary', 0), summary)
+        wb.active = 0
+    save_workbook(wb, output_file)
+
+def save_workbook(wb, output_file):
+    with metrics.phase("write") as frame:
+        wb.save(output_file)
+        frame["bytes"] += os.path.getsize(output_file)
+
+def build_workbook(components, icons=True):
+    # openpyxl (and PIL for the icons) are only imported when a workbook is written
+    from openpyxl import Workbook
+    from openpyxl.styles import PatternFill, Font, Alignment
+    from openpyxl.drawing.image import Image
+    from openpyxl.drawing.spreadsheet_drawing import AbsoluteAnchor
+    from openpyxl.drawing.xdr import XDRPoint2D, XDRPositiveSize2D
+    from openpyxl.utils.units import pixels_to_EMU
+
     wb = Workbook()
     ws = wb.active
     ws.title = 'Licenses'
@@ -177,10 +291,10 @@ def export_to_excel(components, output_file='licenses.xlsx'):
     # Add data rows and apply styles
     for idx, component in enumerate(components, start=1):
         row = [
-            component['file_name'],
-            component['license_name'],
-            # component['spdx_id'],
-            # component['license_url']
+            component.file_name,
+            component.license_name,
+            # component.spdx_id,
+            # component.license_url
         ]
         
         ws.append(row)
@@ -197,8 +311,8 @@ def export_to_excel(components, output_file='licenses.xlsx'):
             cell.font = custom_font
 
         # Add hyperlink to the 'License' column
-        license_name = component['license_name']
-        license_url = component['license_url']
+        license_name = component.license_name
+        license_url = component.license_url
         
         if license_url:
             cell = ws.cell(row=idx + 1, column=2)  # 'License' column
@@ -210,10 +324,15 @@ def export_to_excel(components, output_file='licenses.xlsx'):
         # file_name_cell.font = Font(color="FF0000")  # Red font color for the file name
         
         # Add icons for risk_rating
-        risk_rating = component['risk_rating']
+        risk_rating = component.risk_rating
         risk_rating_icon_path = RiskRating.get_icon(risk_rating)  # Get the icon path
         risk_rating_risk_name = RiskRating.to_string(risk_rating)  # Get the risk rating text
-        
+
+        if not icons:
+            # Two Image loads per row are most of the build time, --no-icons writes the name only
+            ws.cell(row=idx + 1, column=3, value=risk_rating_risk_name)
+            continue
+
         try:
             if risk_rating_icon_path:
                 if os.path.exists(risk_rating_icon_path):
@@ -259,30 +378,569 @@ def export_to_excel(components, output_file='licenses.xlsx'):
                 pass
         adjusted_width = (max_length + 2)  # Add some padding for readability
         ws.column_dimensions[column].width = adjusted_width
-        
+
+    return wb
+
+@functools.lru_cache(maxsize=None)
+def icon_image_class():
+    """
+    Define IconImage on first use so openpyxl is not imported at startup.
+    """
+    from openpyxl.drawing.image import Image
+
+    class IconImage(Image):
+        """
+        Image that reuses the PNG bytes loaded once per risk rating instead of
+        opening the file with PIL for every row. openpyxl still writes one image
+        part per placement, which is why the icons are opt-in for big sheets.
+        """
+        _cache = {}
+
+        @classmethod
+        def for_rating(cls, risk_rating):
+            """
+            Return a new placement of the cached icon for the risk rating, or None.
+            """
+            if risk_rating not in cls._cache:
+                icon_path = RiskRating.get_icon(risk_rating)
+                if icon_path and os.path.exists(icon_path):
+                    icon = Image(icon_path)
+                    with open(icon_path, "rb") as f:
+                        icon.data = f.read()
+                    icon.__class__ = cls
+                    icon.width = 25
+                    icon.height = 25
+                    cls._cache[risk_rating] = icon
+                else:
+                    cls._cache[risk_rating] = None
+
+            icon = cls._cache[risk_rating]
+            # Each placement needs its own anchor, the image data is shared
+            return copy.copy(icon) if icon is not None else None
+
+        def _data(self):
+            return self.data
+
+    return IconImage
+
+def license_styles():
+    """
+    Build the named styles shared by every cell of the streaming export.
+    """
+    from openpyxl.styles import PatternFill, Font, Alignment, NamedStyle
+
+    custom_font = Font(name="Soleil") if font_path else Font()
+    alignment = Alignment(horizontal="left", vertical="center")
+    fills = {
+        "odd": PatternFill(start_color="F9F9F9", end_color="F9F9F9", fill_type="solid"),
+        "even": PatternFill(start_color="FFFFFF", end_color="FFFFFF", fill_type="solid"),
+    }
+
+    styles = {"header": NamedStyle(name="license_header", font=Font(bold=True))}
+    for parity, fill in fills.items():
+        styles[parity] = NamedStyle(name=f"license_{parity}", font=custom_font, fill=fill, alignment=alignment)
+        styles[f"{parity}_link"] = NamedStyle(name=f"license_{parity}_link", font=Font(color="4E9EBF", underline="single"), fill=fill, alignment=alignment)
+
+    # Change column of the delta export
+    styles["new"] = NamedStyle(name="license_new", font=Font(bold=True, color="B91C1C"), alignment=alignment,
+                               fill=PatternFill(start_color="FEE2E2", end_color="FEE2E2", fill_type="solid"))
+    styles["fixed"] = NamedStyle(name="license_fixed", font=Font(bold=True, color="15803D"), alignment=alignment,
+                                 fill=PatternFill(start_color="DCFCE7", end_color="DCFCE7", fill_type="solid"))
+    return styles
+
+def register_license_styles(wb):
+    """
+    Register the shared styles once per workbook, cells only reference them by name.
+    """
+    styles = license_styles()
+    for style in styles.values():
+        wb.add_named_style(style)
+    return styles
+
+# Longest string literal allowed in an Excel formula
+FORMULA_STRING_LIMIT = 255
+
+def link_formula(url, text):
+    """
+    HYPERLINK formula of the url, or None if it does not fit in a formula.
+    Cell hyperlinks are kept in memory by openpyxl until the sheet is closed, formulas
+    are streamed with the row.
+    """
+    if len(url) > FORMULA_STRING_LIMIT or len(text or "") > FORMULA_STRING_LIMIT:
+        return None
+    quote = lambda value: '"' + value.replace('"', '""') + '"'
+    return f"=HYPERLINK({quote(url)},{quote(text or url)})"
+
+def write_license_sheet(ws, components, styles, icons=False, changes=None):
+    """
+    Write the license rows into a write-only worksheet.
+    With changes ("new" or "fixed" per component), a highlighted Change column comes first.
+    With icons, every row gets a risk icon drawing; openpyxl stores one image part per
+    placement, so they are only suitable for small sheets.
+    """
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.utils import get_column_letter
+
+    # Define header row
+    headers = ['Component Filename', 'License', 'License Risk',]
+
+    # Column widths must be set before the first row is written in write-only mode,
+    # so they are measured on the values instead of walking the cells afterwards
+    widths = [len(header) for header in headers]
+    for component in components:
+        widths[0] = max(widths[0], len(component.file_name or ''))
+        widths[1] = max(widths[1], len(component.license_name or ''))
+    widths[2] = max([widths[2]] + [len("    " + rating["name"]) for rating in RISK_RATING.values()])
+    if changes is not None:
+        headers.insert(0, 'Change')
+        widths.insert(0, len('Change'))
+    # The risk icons are anchored in the last column
+    risk_column = get_column_letter(len(headers))
+    for col, width in enumerate(widths, start=1):
+        ws.column_dimensions[get_column_letter(col)].width = width + 2  # Add some padding for readability
+
+    # Define row height once for the whole sheet instead of per row
+    ws.sheet_format.defaultRowHeight = 25
+    ws.sheet_format.customHeight = True
+
+    # Resolving a named style on every cell dominates the row render, the style array of
+    # each named style is resolved once and shared by its cells (they are never modified)
+    style_arrays = {}
+    for key, style in styles.items():
+        cell = WriteOnlyCell(ws)
+        cell.style = style.name
+        style_arrays[key] = cell._style
+
+    def styled(value, style):
+        cell = WriteOnlyCell(ws, value=value)
+        cell._style = style_arrays[style]
+        return cell
+
+    ws.append([styled(header, "header") for header in headers])
+
+    for idx, component in enumerate(components, start=1):
+        parity = "odd" if idx % 2 != 0 else "even"
+
+        if component.license_url:
+            license_cell = styled(link_formula(component.license_url, component.license_name), f"{parity}_link")
+            if license_cell.value is None:
+                license_cell.value = component.license_name
+                license_cell.hyperlink = component.license_url
+        else:
+            license_cell = styled(component.license_name, parity)
+
+        risk_rating = component.risk_rating
+        risk_name = component.risk_name
+        icon = icon_image_class().for_rating(risk_rating) if icons else None
+        if icon is not None:
+            ws.add_image(icon, f'{risk_column}{idx + 1}')
+            risk_name = "    " + risk_name
+
+        row = [
+            styled(component.file_name, parity),
+            license_cell,
+            styled(risk_name, parity),
+        ]
+        if changes is not None:
+            row.insert(0, styled(changes[idx - 1].capitalize(), changes[idx - 1]))
+        ws.append(row)
+
+def export_to_excel_streaming(components, output_file='licenses.xlsx', icons=False):
+    """
+    Export the components with a write-only worksheet, rows are flushed to disk
+    as they are appended so memory stays bounded for very large reports.
+    Risk icons are off by default: they are drawings kept in memory until save,
+    each stored as its own image part.
+    """
+    from openpyxl import Workbook
+
+    with metrics.phase("aggregate", rows=len(components)):
+        summary = aggregate_licenses(components)
+
+    wb = Workbook(write_only=True)
+    with metrics.phase("render", rows=len(components)):
+        styles = register_license_styles(wb)
+        write_summary_sheet(wb.create_sheet('Summary'), summary)
+        write_license_sheet(wb.create_sheet('Licenses'), components, styles, icons)
+
     # Save the file
-    wb.save(output_file)
+    save_workbook(wb, output_file)
 
-def main():
-    parser = argparse.ArgumentParser(description="Extract software composicion licenses and convert output to xlxs.")
-    parser.add_argument("--xml", help="xml file to extract license")
- 
-    args = parser.parse_args()
+def stream_report(xml_file):
+    """
+    Start streaming the report, returns (metadata, iterator of the license findings).
+    Raises ValueError if the report is invalid.
+    """
+    events = iter_report(xml_file)
+    kind, metadata = next(events, (None, None))
+    if kind != "metadata":
+        raise ValueError("Root element is not 'detailedreport'.")
+    return metadata, (value for kind, value in events if kind == "license")
+
+def index_report(xml_file):
+    """
+    Hash index of the license findings of a report on (component file, license),
+    built while the report is streamed. Used as the baseline of export_delta.
+    """
+    with metrics.phase("parse", bytes=os.path.getsize(xml_file)) as frame:
+        _, findings = stream_report(xml_file)
+        index = index_findings(findings)
+        frame["rows"] += len(index)
+    return index
+
+def export_delta(xml_file, baseline, icons=False, store=None):
+    """
+    Compare the report with a baseline (an index from index_report) and export only the
+    new and fixed license findings, highlighted in a Change column. The report is
+    streamed against the baseline index, only the changes are kept.
+    Returns (output_file, new, fixed, unchanged).
+    """
+    metadata, components = stream_report(xml_file)
+    print_metadata(metadata)
+    if store:
+        from history import FindingsStore
+        components = FindingsStore(store).record_licenses(metadata, components, xml_file)
+
+    with metrics.phase("delta", bytes=os.path.getsize(xml_file)):
+        new, fixed, unchanged = diff_findings(baseline, components)
+    print(f"New: {len(new)}, Fixed: {len(fixed)}, Unchanged: {unchanged}")
+    sort_components(new)
+    sort_components(fixed)
+
+    from openpyxl import Workbook
+
+    delta = new + fixed
+    changes = ["new"] * len(new) + ["fixed"] * len(fixed)
+    output_file = "delta_" + generate_filename(metadata)
+    wb = Workbook(write_only=True)
+    with metrics.phase("render", rows=len(delta)):
+        styles = register_license_styles(wb)
+        write_license_sheet(wb.create_sheet('License Changes'), delta, styles, icons, changes)
+    save_workbook(wb, output_file)
+    return output_file, new, fixed, unchanged
+
+def license_row(component):
+    return [component.file_name, component.license_name, component.spdx_id, component.license_url, component.risk_name]
+
+def export_to_csv(components, output_file):
+    import csv
+
+    with metrics.phase("csv") as frame, open(output_file, "w", newline="", encoding="utf-8", buffering=EXPORT_BUFFER) as f:
+        writer = csv.writer(f)
+        writer.writerow(["File Name", "License Name", "SPDX ID", "License URL", "Risk Rating"])
+        for component in components:
+            writer.writerow(license_row(component))
+            frame["rows"] += 1
+
+def export_to_jsonl(components, output_file):
+    import json
+
+    with metrics.phase("jsonl") as frame, open(output_file, "w", encoding="utf-8", buffering=EXPORT_BUFFER) as f:
+        for component in components:
+            f.write(json.dumps(dict(zip(LICENSE_FIELDS, license_row(component))), ensure_ascii=False))
+            f.write("\n")
+            frame["rows"] += 1
+
+def export_formats(components, output_file, formats=("xlsx",), streaming=False, icons=None):
+    """
+    Export the parsed components in every selected format, the file names are output_file
+    with the extension of each format. With several formats the exporters are fed from the
+    single parse through bounded queues (threads sharing the GIL, not parallel writers).
+    Returns the output files, raises the first exporter error.
+    """
+    base = os.path.splitext(output_file)[0]
+    exporters = {
+        # The workbook exporters need a list (row count), it only holds references to the parsed components
+        "xlsx": lambda items: export_to_excel(list(items), base + ".xlsx", streaming=streaming, icons=icons),
+        "csv": lambda items: export_to_csv(items, base + ".csv"),
+        "jsonl": lambda items: export_to_jsonl(items, base + ".jsonl"),
+    }
+    formats = list(dict.fromkeys(formats))
+    if len(formats) == 1:
+        exporters[formats[0]](components)
+    else:
+        results = fan_out(components, {report_format: exporters[report_format] for report_format in formats})
+        for report_format in formats:
+            if results[report_format][1] is not None:
+                raise results[report_format][1]
+    return [base + LICENSE_FORMATS[report_format] for report_format in formats]
+
+def sheet_title(metadata, used):
+    """
+    Build a unique, Excel-safe sheet title (max 31 chars) for an app.
+    """
+    title = metadata.get("app_name") or "Unknown"
+    for char in '[]:*?/\\':
+        title = title.replace(char, "_")
+    title = title[:31]
+
+    # Suffix duplicated app names with a counter
+    candidate, counter = title, 2
+    while candidate.lower() in used:
+        suffix = f" ({counter})"
+        candidate = title[:31 - len(suffix)] + suffix
+        counter += 1
+    used.add(candidate.lower())
+    return candidate
+
+def expand_inputs(inputs):
+    """
+    Expand files, glob patterns and directories into a sorted list of xml files.
+    """
+    files = []
+    for item in inputs:
+        if os.path.isdir(item):
+            files.extend(sorted(glob.glob(os.path.join(item, "*.xml"))))
+        elif glob.has_magic(item):
+            files.extend(sorted(glob.glob(item)))
+        else:
+            files.append(item)
+
+    # Drop duplicates while keeping the order
+    return list(dict.fromkeys(files))
+
+def parse_report(xml_file, store=None):
+    """
+    Worker task: parse one report and return (xml_file, metadata, components).
+    With store (a findings history database), the license findings are also saved there.
+    """
+    metadata, components = read_report(xml_file)
+    if metadata is None:
+        raise ValueError("Root element is not 'detailedreport'.")
+    if store:
+        from history import FindingsStore
+        with metrics.phase("store", rows=len(components)):
+            FindingsStore(store).save_licenses(metadata, components, xml_file)
+    return xml_file, metadata, components
+
+def unique_filenames(xml_files):
+    """
+    Output names of the reports whose app, sandbox and version match an earlier report
+    of the batch, suffixed with a counter so parallel workers never write the same file.
+    Returns {xml_file: filename} for the renamed reports only.
+    """
+    used = set()
+    renamed = {}
+    for xml_file in xml_files:
+        try:
+            metadata = extract_metada(xml_file)
+        except (ET.ParseError, OSError):
+            # Reported when the report itself is processed
+            continue
+        if metadata is None:
+            continue
+        filename = generate_filename(metadata)
+        base, extension = os.path.splitext(filename)
+        candidate, counter = filename, 2
+        while candidate.lower() in used:
+            candidate = f"{base}-{counter}{extension}"
+            counter += 1
+        used.add(candidate.lower())
+        if candidate != filename:
+            renamed[xml_file] = candidate
+    return renamed
+
+def export_report(xml_file, streaming=False, icons=None, store=None, formats=("xlsx",), renamed=None):
+    """
+    Worker task: parse one report and export it to its own files, one per format.
+    renamed maps reports to the output name to use instead of the app name, see unique_filenames.
+    """
+    xml_file, metadata, components = parse_report(xml_file, store)
+    output_file = (renamed or {}).get(xml_file) or generate_filename(metadata)
+    output_files = export_formats(components, output_file, formats, streaming, icons)
+    return xml_file, output_files
+
+def run_task(task, xml_file, kwargs):
+    """
+    Worker entry point: run the task and return its result with the metrics of this report.
+    """
+    metrics.reset()
+    return task(xml_file, **kwargs), metrics.snapshot()
+
+def run_batch(xml_files, task, workers=None, **kwargs):
+    """
+    Run the task for every report on a process pool, yielding (xml_file, result, error).
+    A failing report, or a worker process dying on one, does not stop the rest of the batch.
+    """
+    if workers == 1 or len(xml_files) == 1:
+        for xml_file in xml_files:
+            try:
+                yield xml_file, task(xml_file, **kwargs), None
+            except Exception as e:
+                yield xml_file, None, e
+        return
+
+    from collections import deque
+    from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+    from concurrent.futures.process import BrokenProcessPool
+
+    # One report per worker, so a crashed worker only fails the reports that were running
+    workers = workers or os.cpu_count() or 1
+    pending = deque(xml_files)
+    running = {}
+    executor = ProcessPoolExecutor(max_workers=workers)
+    try:
+        while pending or running:
+            broken = False
+            while pending and len(running) < workers:
+                try:
+                    future = executor.submit(run_task, task, pending[0], kwargs)
+                except BrokenProcessPool:
+                    broken = True
+                    break
+                running[future] = pending.popleft()
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            if any(isinstance(future.exception(), BrokenProcessPool) for future in done):
+                broken = True
+            if broken:
+                # A worker died (out of memory, crash in a native library): the reports that
+                # were running fail with it, the remaining ones go to a new pool
+                done, _ = wait(running)
+            for future in done:
+                xml_file = running.pop(future)
+                try:
+                    result, phases = future.result()
+                except Exception as e:
+                    yield xml_file, None, e
+                else:
+                    # Keep the phases measured in the worker process
+                    metrics.merge(phases)
+                    yield xml_file, result, None
+            if broken:
+                executor.shutdown(wait=False)
+                executor = ProcessPoolExecutor(max_workers=workers)
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+def export_combined(xml_files, output_file, workers=None, icons=False, store=None):
+    """
+    Parse the reports in parallel and write one sheet per app into a single workbook.
+    Returns the number of failed reports.
+    """
+    results = {}
+    failed = 0
+    for xml_file, result, error in run_batch(xml_files, parse_report, workers, store=store):
+        if error is not None:
+            print(f"Error processing {xml_file}: {error}")
+            failed += 1
+        else:
+            results[xml_file] = result
+
+    from openpyxl import Workbook
+
+    wb = Workbook(write_only=True)
+    styles = register_license_styles(wb)
+    used = set()
+    # Keep the sheets in input order, whatever order the workers finished in
+    for xml_file in xml_files:
+        if xml_file in results:
+            _, metadata, components = results.pop(xml_file)
+            with metrics.phase("render", rows=len(components)):
+                write_license_sheet(wb.create_sheet(sheet_title(metadata, used)), components, styles, icons)
+
+    if used:
+        save_workbook(wb, output_file)
+        print(f"Combined report saved to {output_file}")
+    return failed
+
+def run(args, parser):
+    formats = args.format or ["xlsx"]
+    # None keeps the default of each exporter, see export_to_excel
+    icons = True if args.icons else False if args.no_icons else None
+    if args.watch:
+        from watch import watch_directory
+        stats = watch_directory(args.watch, args.workers, args.state, args.status, args.poll_interval, args.polling,
+                                streaming=args.streaming, icons=icons, store=args.store, formats=formats)
+        sys.exit(1 if stats.failed else 0)
 
     # Check if essential arguments are missing and show help if true
     if not args.xml:
         print("Error: Missing required arguments!")
         parser.print_help()
         sys.exit(1) 
-    
-    # Extract License
-    licences = extract_license(args.xml)
-    
-    # Get App MetaData Info 
-    metadata = extract_metada(args.xml)
-    output_file_name = generate_filename(metadata)
-    export_to_excel(licences, output_file_name)
-    sys.exit(1) 
+
+    xml_files = expand_inputs(args.xml)
+    if not xml_files:
+        print("Error: No xml files found!")
+        sys.exit(1)
+
+    if set(formats) != {"xlsx"} and (args.baseline or args.combined):
+        print("Error: --baseline and --combined only write xlsx workbooks, --format csv/jsonl is not supported with them!")
+        sys.exit(1)
+
+    if args.baseline:
+        if len(xml_files) != 1:
+            print("Error: --baseline compares a single xml file!")
+            sys.exit(1)
+        try:
+            baseline = index_report(args.baseline)
+        except Exception as e:
+            print(f"Error processing the baseline {args.baseline}: {e}")
+            sys.exit(1)
+        try:
+            output_file, new, fixed, unchanged = export_delta(xml_files[0], baseline, icons, args.store)
+        except Exception as e:
+            print(f"Error processing {xml_files[0]}: {e}")
+            sys.exit(1)
+        print(f"License changes saved to {output_file}")
+        failing = new_at_or_above(new, args.fail_on)
+        if failing:
+            print(f"{len(failing)} new licenses at or above {args.fail_on} risk.")
+        sys.exit(1 if failing else 0)
+
+    if args.combined:
+        failed = export_combined(xml_files, args.combined, args.workers, icons=icons, store=args.store)
+    else:
+        # Extract App MetaData Info and License, then export one workbook per app
+        failed = 0
+        renamed = unique_filenames(xml_files) if len(xml_files) > 1 else {}
+        for xml_file, result, error in run_batch(xml_files, export_report, args.workers, streaming=args.streaming,
+                                                 icons=icons, store=args.store, formats=formats, renamed=renamed):
+            if error is not None:
+                print(f"Error processing {xml_file}: {error}")
+                failed += 1
+            else:
+                print(f"License report saved to {', '.join(result[1])}")
+
+    if len(xml_files) > 1:
+        print(f"Processed {len(xml_files) - failed}/{len(xml_files)} reports.")
+    sys.exit(1 if failed else 0)
+
+def add_arguments(parser):
+    parser.add_argument("--xml", nargs="+", help="xml files, glob patterns or directories to extract license")
+    parser.add_argument("--format", action="append", choices=list(LICENSE_FORMATS),
+                        help="Export format, repeatable to write several formats from one parse (default: xlsx)")
+    parser.add_argument("--streaming", action="store_true", help="Use the write-only exporter, recommended for very large reports")
+    parser.add_argument("--icons", action="store_true",
+                        help="Draw the risk icons in the write-only exports (streaming, combined, baseline), slow for big reports")
+    parser.add_argument("--no-icons", action="store_true",
+                        help="Do not draw the risk icons in the default workbook (they are off by default in the write-only exports)")
+    parser.add_argument("-w", "--workers", type=int, default=None, help="Number of worker processes for batches (default: CPU count)")
+    parser.add_argument("--combined", metavar="FILE", help="Write every app into one workbook, one sheet per app")
+    parser.add_argument("--baseline", metavar="XML", help="Previous detailed report to compare with, only new and fixed licenses are exported")
+    parser.add_argument("--fail-on", choices=[rating["name"] for rating in RISK_RATING.values()], default="Low",
+                        help="With --baseline, exit with an error if new licenses at or above this risk appeared")
+    parser.add_argument("--store", nargs="?", const=default_history_file(), metavar="DB",
+                        help="Also save the license findings to the findings history (default: %(const)s)")
+    parser.add_argument("--watch", metavar="DIR", help="Keep running and export every xml report dropped into this folder")
+    parser.add_argument("--state", metavar="FILE", default="verareport_watch_state.json", help="Watch mode: content hashes of the exported reports, already exported reports are skipped")
+    parser.add_argument("--status", metavar="FILE", default="verareport_status.json", help="Watch mode: status file with the queue depth and throughput")
+    parser.add_argument("--poll-interval", type=float, default=2.0, help="Watch mode: seconds between folder listings when polling")
+    parser.add_argument("--polling", action="store_true", help="Watch mode: poll the folder instead of using inotify (network shares)")
+    parser.add_argument("--metrics", metavar="FILE", help="Save per-phase timing and resource metrics as JSON")
+    parser.add_argument("--profile", metavar="FILE", help="Save a cProfile dump of the run (main process only)")
+    return parser
+
+def execute(args, parser):
+    with instrumented("verareport", args.metrics, args.profile):
+        run(args, parser)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Extract software composicion licenses and convert output to xlxs.")
+    add_arguments(parser)
+    execute(parser.parse_args(argv), parser)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    freeze_support()
+    main()
@@ -0,0 +1,365 @@
+import os
+import sys
+import json
+import mmap
+import math
+import time
+import struct
+import hashlib
+import zipfile
+import argparse
+import tempfile
+import shutil
+import functools
+from veracore import default_osv_index
+
+# Index file layout: header, hash slots, records, manifest.
+# A slot is (key hash, record offset + 1), 0 marks an empty slot. A record is a
+# length prefixed compact JSON document. The manifest (JSON) maps every file of
+# the dump to its signature, record and keys, so an updated dump only re-parses
+# the files that changed.
+MAGIC = b"VERAOSV1"
+HEADER = struct.Struct("<8sQQQQ")
+SLOT = struct.Struct("<QQ")
+LENGTH = struct.Struct("<I")
+
+CHUNK_SIZE = 1024 * 1024
+
+# Decoded records kept per index, reports repeat the same ids across components
+LOOKUP_CACHE = 4096
+
+def key_hash(key):
+    return int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little")
+
+def normalize(vulnerability_id):
+    return (vulnerability_id or "").strip().upper()
+
+# CVSS v3 base metric weights
+CVSS3_WEIGHTS = {
+    "AV": {"N": 0.85, "A": 0.62, "L": 0.55, "P": 0.2},
+    "AC": {"L": 0.77, "H": 0.44},
+    "UI": {"N": 0.85, "R": 0.62},
+    "C": {"H": 0.56, "L": 0.22, "N": 0.0},
+    "I": {"H": 0.56, "L": 0.22, "N": 0.0},
+    "A": {"H": 0.56, "L": 0.22, "N": 0.0},
+}
+CVSS3_PRIVILEGES = {"U": {"N": 0.85, "L": 0.62, "H": 0.27}, "C": {"N": 0.85, "L": 0.68, "H": 0.5}}
+
+def _round_up(value):
+    # Round up to one decimal as defined by the CVSS v3.1 specification
+    integer = round(value * 100000)
+    if integer % 10000 == 0:
+        return integer / 100000.0
+    return (math.floor(integer / 10000) + 1) / 10.0
+
+def cvss3_score(vector):
+    """
+    Base score of a CVSS v3.x vector, or None if the vector is incomplete.
+    """
+    metrics = dict(part.split(":", 1) for part in vector.split("/")[1:] if ":" in part)
+    try:
+        scope = metrics["S"]
+        av, ac, ui = (CVSS3_WEIGHTS[name][metrics[name]] for name in ("AV", "AC", "UI"))
+        pr = CVSS3_PRIVILEGES[scope][metrics["PR"]]
+        c, i, a = (CVSS3_WEIGHTS[name][metrics[name]] for name in ("C", "I", "A"))
+    except KeyError:
+        return None
+
+    iss = 1 - (1 - c) * (1 - i) * (1 - a)
+    if scope == "U":
+        impact = 6.42 * iss
+    else:
+        impact = 7.52 * (iss - 0.029) - 3.25 * (iss - 0.02) ** 15
+    if impact <= 0:
+        return 0.0
+    exploitability = 8.22 * av * ac * pr * ui
+    if scope == "U":
+        return _round_up(min(impact + exploitability, 10))
+    return _round_up(min(1.08 * (impact + exploitability), 10))
+
+def osv_record(document):
+    """
+    Keep what the reports show of an OSV entry: id, aliases, fixed versions and severity.
+    Returns None if the document is not an OSV entry.
+    """
+    if not isinstance(document, dict) or not document.get("id"):
+        return None
+
+    fixed = []
+    severities = list(document.get("severity") or [])
+    for affected in document.get("affected") or []:
+        severities.extend(affected.get("severity") or [])
+        for version_range in affected.get("ranges") or []:
+            # Git ranges are fixed by a commit, not a version
+            if version_range.get("type") == "GIT":
+                continue
+            for event in version_range.get("events") or []:
+                if event.get("fixed") and event["fixed"] not in fixed:
+                    fixed.append(event["fixed"])
+
+    score = vector = None
+    for severity in severities:
+        if severity.get("type", "").startswith("CVSS_V3") and severity.get("score"):
+            vector = severity["score"]
+            score = cvss3_score(vector)
+            break
+        vector = vector or severity.get("score")
+
+    return {
+        "id": document["id"],
+        "aliases": document.get("aliases") or [],
+        "fixed": fixed,
+        "score": score,
+        "vector": vector,
+        # GHSA entries carry a severity level (LOW ... CRITICAL)
+        "severity": (document.get("database_specific") or {}).get("severity"),
+    }
+
+def dump_entries(dump):
+    """
+    Yield (name, signature, open_function) for every JSON file of the dump, a directory
+    or a zip archive (the all.zip export of osv.dev).
+    """
+    if os.path.isdir(dump):
+        # Names are built from the walk itself, a dump holds hundreds of thousands of files
+        folders = [(dump, "")]
+        while folders:
+            folder, prefix = folders.pop()
+            with os.scandir(folder) as it:
+                for entry in it:
+                    if entry.is_dir():
+                        folders.append((entry.path, prefix + entry.name + "/"))
+                    elif entry.name.endswith(".json"):
+                        stat = entry.stat()
+                        yield (prefix + entry.name, f"{stat.st_size}:{stat.st_mtime_ns}",
+                               lambda path=entry.path: open(path, "rb"))
+    elif zipfile.is_zipfile(dump):
+        with zipfile.ZipFile(dump) as archive:
+            for info in archive.infolist():
+                if info.is_dir() or not info.filename.endswith(".json"):
+                    continue
+                yield info.filename, f"{info.file_size}:{info.CRC}", lambda info=info: archive.open(info)
+    else:
+        raise ValueError(f"{dump} is not a directory or a zip archive of OSV entries")
+
+class OsvIndex:
+    """
+    Read-only view of an index file, memory-mapped so only the pages of the looked up
+    records are read. The most recently decoded records are kept, repeated ids are
+    decoded once.
+    """
+
+    def __init__(self, index_file):
+        self.index_file = index_file
+        with open(index_file, "rb") as f:
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.mm) < HEADER.size:
+            self.mm.close()
+            raise ValueError(f"{index_file} is not an OSV index")
+        magic, self.slot_count, self.slots_offset, self.manifest_offset, self.manifest_length = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC:
+            self.mm.close()
+            raise ValueError(f"{index_file} is not an OSV index")
+        self.mask = self.slot_count - 1
+        self.lookup = functools.lru_cache(maxsize=LOOKUP_CACHE)(self._lookup)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.mm.close()
+
+    def manifest(self):
+        return json.loads(self.mm[self.manifest_offset:self.manifest_offset + self.manifest_length])
+
+    def record_bytes(self, offset):
+        length, = LENGTH.unpack_from(self.mm, offset)
+        return self.mm[offset + LENGTH.size:offset + LENGTH.size + length]
+
+    def _lookup(self, vulnerability_id):
+        """
+        The OSV record of the id or of an entry aliasing it, or None.
+        """
+        key = normalize(vulnerability_id)
+        record = None
+        target = key_hash(key)
+        slot = target & self.mask
+        while True:
+            hash_value, offset = SLOT.unpack_from(self.mm, self.slots_offset + slot * SLOT.size)
+            if offset == 0:
+                break
+            if hash_value == target:
+                candidate = json.loads(self.record_bytes(offset - 1))
+                if key == normalize(candidate["id"]) or key in map(normalize, candidate["aliases"]):
+                    record = candidate
+                    break
+            slot = (slot + 1) & self.mask
+        return record
+
+class BuildResult:
+    __slots__ = ("entries", "parsed", "reused", "removed", "keys", "seconds")
+
+    def __init__(self):
+        self.entries = self.parsed = self.reused = self.removed = self.keys = 0
+        self.seconds = 0.0
+
+    def summary(self):
+        return (f"OSV index: {self.entries} entries, {self.keys} ids "
+                f"({self.parsed} parsed, {self.reused} unchanged, {self.removed} removed) in {self.seconds:.1f}s")
+
+def build_index(dump, index_file=None):
+    """
+    Build or update the index of an OSV dump. Entries whose file signature did not change
+    since the last build are copied from the previous index without parsing them again.
+    The new index replaces the old one atomically.
+    """
+    index_file = index_file or default_osv_index()
+    start = time.perf_counter()
+    result = BuildResult()
+
+    previous, sources = None, {}
+    if os.path.exists(index_file):
+        try:
+            previous = OsvIndex(index_file)
+            sources = previous.manifest()["sources"]
+        except (ValueError, KeyError, OSError) as e:
+            print(f"Rebuilding the OSV index from scratch ({e})")
+            previous, sources = None, {}
+
+    directory = os.path.dirname(os.path.abspath(index_file))
+    os.makedirs(directory, exist_ok=True)
+    manifest = {}
+    # id -> record offset in the data section, the ids of the entries win over aliases
+    ids, aliases = {}, {}
+
+    try:
+        with tempfile.TemporaryFile(dir=directory) as data:
+            for name, signature, open_entry in dump_entries(dump):
+                known = sources.get(name)
+                if known is not None and known[0] == signature:
+                    _, offset, keys = known
+                    record = previous.record_bytes(offset) if offset else None
+                    result.reused += 1
+                else:
+                    try:
+                        with open_entry() as f:
+                            document = osv_record(json.load(f))
+                    except (ValueError, OSError) as e:
+                        print(f"Skipping {name}: {e}")
+                        document = None
+                    record = json.dumps(document, separators=(",", ":")).encode("utf-8") if document else None
+                    keys = [document["id"]] + document["aliases"] if document else []
+                    result.parsed += 1
+
+                if record is None:
+                    # Remember invalid files too, so they are not parsed again
+                    manifest[name] = [signature, 0, []]
+                    continue
+                position = data.tell()
+                data.write(LENGTH.pack(len(record)))
+                data.write(record)
+                manifest[name] = [signature, position, keys]
+                result.entries += 1
+                ids.setdefault(normalize(keys[0]), position)
+                for alias in keys[1:]:
+                    aliases.setdefault(normalize(alias), position)
+
+            result.removed = len(set(sources) - set(manifest))
+            for key, position in aliases.items():
+                ids.setdefault(key, position)
+            result.keys = len(ids)
+
+            # Power of two table at most half full, lookups probe one or two slots
+            slot_count = 16
+            while slot_count < len(ids) * 2:
+                slot_count *= 2
+            slots_offset = HEADER.size
+            data_offset = slots_offset + slot_count * SLOT.size
+            slots = bytearray(slot_count * SLOT.size)
+            mask = slot_count - 1
+            for key, position in ids.items():
+                hash_value = key_hash(key)
+                slot = hash_value & mask
+                while SLOT.unpack_from(slots, slot * SLOT.size)[1]:
+                    slot = (slot + 1) & mask
+                SLOT.pack_into(slots, slot * SLOT.size, hash_value, data_offset + position + 1)
+
+            # Manifest offsets are absolute, like the slots
+            for entry in manifest.values():
+                if entry[2]:
+                    entry[1] += data_offset
+            manifest_bytes = json.dumps({"dump": os.path.abspath(dump), "sources": manifest},
+                                        separators=(",", ":")).encode("utf-8")
+            manifest_offset = data_offset + data.tell()
+
+            tmp_file = index_file + ".tmp"
+            with open(tmp_file, "wb") as out:
+                out.write(HEADER.pack(MAGIC, slot_count, slots_offset, manifest_offset, len(manifest_bytes)))
+                out.write(slots)
+                data.seek(0)
+                shutil.copyfileobj(data, out, CHUNK_SIZE)
+                out.write(manifest_bytes)
+    finally:
+        if previous is not None:
+            previous.close()
+    os.replace(tmp_file, index_file)
+
+    result.seconds = time.perf_counter() - start
+    return result
+
+def score_text(record):
+    # CVSS base score of the entry when known, the advisory severity or the vector otherwise
+    if record.get("score") is not None:
+        return f"{record['score']:.1f}"
+    return record.get("severity") or record.get("vector") or ""
+
+def run(args, parser):
+    if not args.dump and not args.lookup:
+        print("Error: Missing required arguments!")
+        parser.print_help()
+        sys.exit(1)
+
+    if args.dump:
+        try:
+            print(build_index(args.dump, args.index).summary())
+        except (ValueError, OSError) as e:
+            print(f"Error building the OSV index: {e}")
+            sys.exit(1)
+
+    if args.lookup:
+        if not os.path.exists(args.index):
+            print(f"Error: No OSV index at {args.index}, build it with --dump first.")
+            sys.exit(1)
+        missing = 0
+        with OsvIndex(args.index) as index:
+            for vulnerability_id in args.lookup:
+                record = index.lookup(vulnerability_id)
+                if record is None:
+                    print(f"{vulnerability_id}: not found")
+                    missing += 1
+                    continue
+                print(f"{vulnerability_id}: {record['id']}")
+                print(f"  Aliases: {', '.join(record['aliases']) or '-'}")
+                print(f"  Fixed: {', '.join(record['fixed']) or '-'}")
+                print(f"  Score: {score_text(record) or '-'}")
+        sys.exit(1 if missing else 0)
+
+def add_arguments(parser):
+    parser.add_argument("--dump", metavar="PATH", help="OSV dump to index: a folder or zip of OSV JSON entries (e.g. all.zip of osv.dev)")
+    parser.add_argument("--index", default=default_osv_index(), help="OSV index file (default: %(default)s)")
+    parser.add_argument("--lookup", nargs="+", metavar="ID", help="Print the aliases, fixed versions and score of these ids")
+    return parser
+
+def execute(args, parser):
+    run(args, parser)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build and query the offline OSV index used to enrich the reports.")
+    add_arguments(parser)
+    execute(parser.parse_args(argv), parser)
+
+if __name__ == "__main__":
+    main()
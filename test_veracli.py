@@ -0,0 +1,26 @@
+from veracli import iter_scan_table
+
+TABLE = """Scanning sample
+
+Vulnerabilities
+NAME            INSTALLED  FIXED-IN  TYPE    VULNERABILITY   SEVERITY
+detect-secrets  1.4.0      1.5.0     python  CVE-2024-0001   High
+no-misconfigurations-lint  0.1.0     npm     GHSA-aaaa-bbbb-cccc  Low
+requests        2.31.0     2.32.0    python  CVE-2024-35195  Medium
+No misconfigurations found
+
+No secrets found
+
+Policy Results
+Passed
+"""
+
+def test_section_words_in_package_names_do_not_end_the_table(tmp_path):
+    scan_output = tmp_path / "scan.txt"
+    scan_output.write_text(TABLE)
+
+    events = list(iter_scan_table(str(scan_output)))
+
+    assert events[0] == ("headers", ["NAME", "INSTALLED", "FIXED-IN", "TYPE", "VULNERABILITY", "SEVERITY"])
+    names = [record.name for kind, record in events[1:]]
+    assert names == ["detect-secrets", "no-misconfigurations-lint", "requests"]
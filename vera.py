@@ -0,0 +1,32 @@
+import argparse
+from multiprocessing import freeze_support
+
+# The tools defer their heavy imports (openpyxl, PIL, process pools) to the code
+# paths that need them, so building the parsers and --help stay fast.
+import veracli
+import license
+import history
+import osv
+
+COMMANDS = {
+    "scan": (veracli, "Run Veracode scan and convert output to HTML."),
+    "license": (license, "Extract software composicion licenses and convert output to xlxs."),
+    "query": (history, "Query the findings history stored by veracli and verareport."),
+    "osv": (osv, "Build and query the offline OSV index used to enrich the reports."),
+}
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="vera", description="Veracode scan and license reports.")
+    subparsers = parser.add_subparsers(dest="command", metavar="{scan,license,query,osv}")
+    subparsers.required = True
+    for name, (module, description) in COMMANDS.items():
+        subparser = subparsers.add_parser(name, help=description, description=description)
+        module.add_arguments(subparser)
+        subparser.set_defaults(module=module, parser=subparser)
+
+    args = parser.parse_args(argv)
+    args.module.execute(args, args.parser)
+
+if __name__ == "__main__":
+    freeze_support()
+    main()
@@ -0,0 +1,49 @@
+# -*- mode: python ; coding: utf-8 -*-
+
+# Single "vera" executable with the scan and license subcommands.
+# Built as a folder (onedir) instead of --onefile so the interpreter and
+# libraries are not extracted to a temp folder on every run.
+
+a = Analysis(
+    ['vera.py'],
+    pathex=[],
+    binaries=[],
+    datas=[('template.html', '.'), ('template_paged.html', '.'), ('report.css', '.')],
+    hiddenimports=[],
+    hookspath=[],
+    hooksconfig={},
+    runtime_hooks=[],
+    excludes=['tkinter', 'bs4', 'unittest', 'pydoc'],
+    noarchive=False,
+    optimize=0,
+)
+pyz = PYZ(a.pure)
+
+exe = EXE(
+    pyz,
+    a.scripts,
+    [],
+    exclude_binaries=True,
+    name='vera',
+    debug=False,
+    bootloader_ignore_signals=False,
+    strip=False,
+    upx=False,
+    console=True,
+    disable_windowed_traceback=False,
+    argv_emulation=False,
+    target_arch=None,
+    codesign_identity=None,
+    entitlements_file=None,
+    icon=['veracli.ico'],
+)
+
+coll = COLLECT(
+    exe,
+    a.binaries,
+    a.datas,
+    strip=False,
+    upx=False,
+    upx_exclude=[],
+    name='vera',
+)
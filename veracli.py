@@ -3,202 +3,927 @@ import re
 import subprocess
 import argparse
 import sys
-from bs4 import BeautifulSoup
+import io
+import json
+import tempfile
+import hashlib
+import shutil
+import time
+import signal
+import threading
+from collections import deque
+from veracore import (SEVERITY, Severity, Vulnerability, metrics, instrumented, default_history_file, default_osv_index,
+                      diff_findings, new_at_or_above, hash_file, fan_out, EXPORT_BUFFER)
+from html import escape
+from osv import score_text
+
+class ScanResult:
+    """Structured exit information of one veracode scan, truthy when the scan succeeded."""
+    __slots__ = ("source", "output_file", "returncode", "duration", "timed_out", "cached", "error", "stderr")
+
+    def __init__(self, source, output_file, returncode=None, duration=0.0, timed_out=False, cached=False, error=None, stderr=""):
+        self.source = source
+        self.output_file = output_file
+        self.returncode = returncode
+        self.duration = duration
+        self.timed_out = timed_out
+        self.cached = cached
+        self.error = error
+        # Last lines of the CLI error output
+        self.stderr = stderr
+
+    @property
+    def ok(self):
+        return self.returncode == 0 and not self.timed_out and self.error is None
+
+    def __bool__(self):
+        return self.ok
+
+    @property
+    def status(self):
+        if self.cached:
+            return "Cached"
+        if self.timed_out:
+            return "Timed out"
+        if self.error is not None:
+            return "Error"
+        if self.returncode != 0:
+            return f"Exit {self.returncode}"
+        return "OK"
+
+# Number of output lines of the CLI kept in memory for error messages
+OUTPUT_TAIL_LINES = 50
+
+# Longest line read at once from the CLI output, longer lines are split
+MAX_LINE_LENGTH = 8192
+
+def _pump(stream, tail, prefix, echo):
+    """Reads a pipe of the CLI line by line, keeping only the last lines."""
+    for line in iter(lambda: stream.readline(MAX_LINE_LENGTH), ""):
+        line = line.rstrip("\n")
+        tail.append(line)
+        if echo and line:
+            print(f"{prefix}{line}", flush=True)
+    stream.close()
+
+# Seconds to wait for the output readers once the CLI exited, a leftover grandchild
+# may still hold the pipes open
+READER_JOIN_TIMEOUT = 5
+
+# CLI processes currently running, stopped all at once on Ctrl+C in batch mode
+_running = set()
+_running_lock = threading.Lock()
+_cancelled = threading.Event()
+
+def _signal_group(process, sig):
+    # The CLI runs in its own session, so its whole process tree is signalled
+    try:
+        if os.name == "posix":
+            os.killpg(process.pid, sig)
+        elif sig == signal.SIGTERM:
+            process.terminate()
+        else:
+            process.kill()
+    except (ProcessLookupError, PermissionError):
+        pass
+
+def _stop(process, grace=5):
+    """Terminates the CLI and its children, killing them if the CLI does not exit within the grace period."""
+    _signal_group(process, signal.SIGTERM)
+    try:
+        process.wait(grace)
+    except subprocess.TimeoutExpired:
+        _signal_group(process, signal.SIGKILL if os.name == "posix" else signal.SIGTERM)
+        process.wait()
+    else:
+        # Children that ignored SIGTERM must not keep the pipes open
+        if os.name == "posix":
+            _signal_group(process, signal.SIGKILL)
+
+def stop_running_scans():
+    """Stops every running CLI process and prevents new ones from starting."""
+    with _running_lock:
+        _cancelled.set()
+        processes = list(_running)
+    for process in processes:
+        _stop(process)
+
+def slim_source(source, excludes):
+    """Repacks an archive without excluded and duplicate members into a temp folder.
+    Returns the lean archive path, or None to scan the original archive."""
+    from archive import slim_archive
+
+    temp_dir = tempfile.mkdtemp(prefix="veracli_slim_")
+    name = os.path.basename(source)
+    for extension in (".tar.gz", ".tar.bz2", ".tar.xz", ".tgz", ".tar", ".zip"):
+        if name.lower().endswith(extension):
+            name = name[:-len(extension)]
+            break
+    slim_file = os.path.join(temp_dir, name + ".zip")
+
+    with metrics.phase("slim", bytes=os.path.getsize(source)):
+        result = slim_archive(source, slim_file, excludes)
+    if result is None:
+        shutil.rmtree(temp_dir, ignore_errors=True)
+        print(f"{source} is not a zip or tar archive, scanning it as is.")
+        return None
+    print(result.summary())
+    return slim_file
+
+def run_veracode_scan(scan_type, source, output_file="scan_output.txt", output_format="table", timeout=None, progress=True,
+                      slim=None):
+    """Runs the Veracode scan command and saves the output to a file.
+    The CLI output is streamed live (when progress is True) through bounded buffers,
+    and the scan is cancelled after timeout seconds. Returns a ScanResult.
+    With slim (a list of exclude rules), archives are first repacked without the
+    excluded and duplicate files and the lean copy is scanned."""
+    if slim is not None and scan_type == "archive" and os.path.isfile(source):
+        slim_file = slim_source(source, slim)
+        if slim_file:
+            try:
+                result = run_veracode_scan(scan_type, slim_file, output_file, output_format, timeout, progress)
+            finally:
+                shutil.rmtree(os.path.dirname(slim_file), ignore_errors=True)
+            result.source = source
+            return result
 
-def run_veracode_scan(scan_type, source, output_file="scan_output.txt"):
-    """Runs the Veracode scan command and saves the output to a file."""
     command = [
         "veracode", "scan",
         "--type", scan_type,
         "--source", source,
-        "--format", "table",
+        "--format", output_format,
         "--output", output_file
     ]
+    start = time.monotonic()
+    with _running_lock:
+        if _cancelled.is_set():
+            return ScanResult(source, output_file, error="Cancelled")
+        try:
+            # A new session gives the CLI its own process group, so a timeout or Ctrl+C
+            # stops the processes it started too
+            process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                       text=True, errors="replace", bufsize=1, start_new_session=True)
+        except FileNotFoundError as e:
+            print(f"Error: The Veracode CLI executable was not found: {e}")
+            return ScanResult(source, output_file, error=str(e))
+        except OSError as e:
+            print(f"Error running Veracode scan: {e}")
+            return ScanResult(source, output_file, error=str(e))
+        _running.add(process)
+
+    stdout_tail = deque(maxlen=OUTPUT_TAIL_LINES)
+    stderr_tail = deque(maxlen=OUTPUT_TAIL_LINES)
+    prefix = f"[{os.path.basename(os.path.normpath(source))}] "
+    readers = [
+        threading.Thread(target=_pump, args=(process.stdout, stdout_tail, prefix, progress), daemon=True),
+        threading.Thread(target=_pump, args=(process.stderr, stderr_tail, prefix, progress), daemon=True),
+    ]
+    for reader in readers:
+        reader.start()
+
+    timed_out = False
     try:
-        # Run the command and capture stdout and stderr
-        result = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-                
-        # Check for a non-zero exit code and print errors if encountered
-        if result.returncode == 0:
-            print("Veracode scan failed with the following error:")
-            print(result.stderr)  # Detailed error message from stderr
+        process.wait(timeout)
+    except subprocess.TimeoutExpired:
+        timed_out = True
+        print(f"Veracode scan of {source} timed out after {timeout} seconds, stopping it.")
+        _stop(process)
+    except BaseException:
+        # Do not leave the CLI running on Ctrl+C or any other interruption
+        _stop(process)
+        raise
+    finally:
+        with _running_lock:
+            _running.discard(process)
+    for reader in readers:
+        reader.join(READER_JOIN_TIMEOUT)
+
+    result = ScanResult(source, output_file, process.returncode, time.monotonic() - start,
+                        timed_out=timed_out, stderr="\n".join(stderr_tail))
+
+    # Check for a non-zero exit code and print errors if encountered
+    if not timed_out and process.returncode != 0 and not _cancelled.is_set():
+        print(f"Veracode scan of {source} failed with exit code {process.returncode}:")
+        print(result.stderr or "\n".join(stdout_tail))  # Detailed error message from stderr
+    return result
+
+class ScanCache:
+    """On-disk cache of raw scan outputs keyed by the content hash of the source and the scan type."""
+
+    def __init__(self, cache_dir, max_size_mb=500, max_age_days=7):
+        self.cache_dir = cache_dir
+        self.max_size = max_size_mb * 1024 * 1024
+        self.max_age = max_age_days * 24 * 3600
+        os.makedirs(cache_dir, exist_ok=True)
+
+    @staticmethod
+    def hash_file(path):
+        """Hashes the file bytes in chunks."""
+        return hash_file(path)
+
+    @classmethod
+    def hash_tree(cls, path):
+        """Merkle-style hash of a folder: each entry contributes its name, kind and child hash."""
+        digest = hashlib.sha256()
+        with os.scandir(path) as it:
+            entries = sorted(it, key=lambda entry: entry.name)
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                digest.update(f"d {entry.name} {cls.hash_tree(entry.path)}\n".encode())
+            elif entry.is_file(follow_symlinks=False):
+                digest.update(f"f {entry.name} {cls.hash_file(entry.path)}\n".encode())
+            elif entry.is_symlink():
+                digest.update(f"l {entry.name} {os.readlink(entry.path)}\n".encode())
+        return digest.hexdigest()
+
+    def key(self, scan_type, source, output_format="table", options=None):
+        """Returns the cache key for the source, or None if it is not a local file or folder.
+        options (e.g. the archive exclude rules) are part of the key."""
+        if os.path.isdir(source):
+            content_hash = self.hash_tree(source)
+        elif os.path.isfile(source):
+            content_hash = self.hash_file(source)
+        else:
             return None
-        
-        return output_file
-    
-    except FileNotFoundError as e:
-        print(f"Error: The Veracode CLI executable was not found: {e}")
-        return None
-    except subprocess.CalledProcessError as e:
-        print(f"Error running Veracode scan: {e}")
+        extra = "\n".join(options) if options is not None else ""
+        return hashlib.sha256(f"{scan_type}:{output_format}:{content_hash}:{extra}".encode()).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.txt")
+
+    def get(self, key, output_file):
+        """Copies the cached output to output_file, returns True on a hit."""
+        path = self._path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.max_age:
+                os.remove(path)
+                return False
+            shutil.copyfile(path, output_file)
+            # Refresh the entry so eviction drops the least recently used first
+            os.utime(path)
+            return True
+        except FileNotFoundError:
+            return False
+
+    def put(self, key, output_file):
+        """Stores the scan output and evicts old entries."""
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+        os.close(fd)
+        shutil.copyfile(output_file, tmp_path)
+        os.replace(tmp_path, self._path(key))
+        self.evict()
+
+    def evict(self):
+        """Removes expired entries, then the oldest ones until the cache fits in max_size."""
+        entries = []
+        now = time.time()
+        for entry in os.scandir(self.cache_dir):
+            if not entry.name.endswith(".txt"):
+                continue
+            try:
+                stat = entry.stat()
+            except FileNotFoundError:
+                continue
+            if now - stat.st_mtime > self.max_age:
+                self._remove(entry.path)
+            else:
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_size:
+                break
+            self._remove(path)
+            total -= size
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+def default_cache_dir():
+    return os.environ.get("VERACLI_CACHE_DIR", os.path.join(os.path.expanduser("~"), ".veracli", "cache"))
+
+def cached_scan(scan_type, source, output_file, cache=None, output_format="table", timeout=None, progress=True, slim=None):
+    """Runs the scan unless an identical source was already scanned, reusing the cached output.
+    Returns a ScanResult."""
+    with metrics.phase("cache"):
+        key = cache.key(scan_type, source, output_format, slim) if cache else None
+        if key and cache.get(key, output_file):
+            print(f"Using cached scan result for {source}")
+            return ScanResult(source, output_file, returncode=0, cached=True)
+
+    with metrics.phase("scan") as frame:
+        result = run_veracode_scan(scan_type, source, output_file, output_format, timeout, progress, slim)
+        if result and os.path.exists(output_file):
+            frame["bytes"] += os.path.getsize(output_file)
+
+    if result and key:
+        with metrics.phase("cache"):
+            cache.put(key, output_file)
+    return result
+
+# Lines that start a new section of the table output, closing the Vulnerabilities one.
+# Matched at the start of the line only, package names such as detect-secrets are rows
+SECTION_MARKERS = ("No misconfigurations found", "No secrets found", "Policy Results")
+
+def iter_lines(scan_output):
+    """Yields the lines of the file one at a time."""
+    with open(scan_output, "r") as f:
+        yield from f
+
+def parse_row(row, headers):
+    """Splits one table row into a Vulnerability, the Fixed-In column may be empty."""
+    columns = row.split(maxsplit=len(headers) - 1)
+
+    # Ensure each column has a default value if missing
+    name = columns[0]
+    installed = columns[1]
+    fixed_in = columns[2] if len(columns) > 5 else ""
+    type_column = columns[3] if len(columns) > 5 else columns[2]
+    vulnerability = columns[4] if len(columns) > 5 else columns[3]
+    severity = columns[-1].strip()
+    return Vulnerability(name, installed, fixed_in, type_column, vulnerability, severity)
+
+def iter_scan_table(scan_output):
+    """Line by line state machine over the table output.
+    Yields ("headers", [...]) once the Vulnerabilities header row is read, then
+    ("vulnerability", Vulnerability) for every row until the next section starts."""
+    state = "seek"
+    headers = None
+    for line in iter_lines(scan_output):
+        text = line.strip()
+        if state == "seek":
+            if text == "Vulnerabilities":
+                state = "headers"
+        elif state == "headers":
+            if not text or text.startswith(SECTION_MARKERS):
+                return
+            headers = text.split()
+            yield "headers", headers
+            state = "rows"
+        else:
+            # A blank line or the next section header closes the table
+            if not text or text.startswith(SECTION_MARKERS):
+                return
+            try:
+                yield "vulnerability", parse_row(text, headers)
+            except IndexError:
+                print(f"Skipping malformed row: {text}")
+
+# Column headers of the report when the findings come from the JSON output
+JSON_HEADERS = ["NAME", "INSTALLED", "FIXED-IN", "TYPE", "VULNERABILITY", "SEVERITY"]
+
+class JSONStream:
+    """Minimal incremental JSON reader: walks the document structure itself and only
+    decodes the values it is asked for, reading the file in chunks."""
+
+    def __init__(self, f, chunk_size=64 * 1024):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self, size):
+        """Reads more data, returns False at the end of the file."""
+        data = self.f.read(size)
+        if not data:
+            return False
+        # Drop what was already consumed so the buffer only holds the current value
+        self.buffer = self.buffer[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def peek(self):
+        """Returns the next non-whitespace character without consuming it, or '' at the end."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill(self.chunk_size):
+                return ""
+
+    def expect(self, char):
+        if self.peek() != char:
+            raise ValueError(f"Invalid JSON: expected '{char}' at offset {self.pos}")
+        self.pos += 1
+
+    def value(self):
+        """Decodes the next complete value, growing the buffer until it fits."""
+        self.peek()
+        size = self.chunk_size
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+                # A number may continue in the next chunk
+                if (not isinstance(value, (int, float))
+                        or self.buffer[end:].strip("0123456789.eE+-")
+                        or not self._fill(size)):
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if not self._fill(size):
+                    raise
+                size *= 2
+
+    def iter_array(self):
+        """Yields the items of the array at the current position one at a time."""
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            if self.peek() == ",":
+                self.pos += 1
+            else:
+                self.expect("]")
+                return
+
+    def iter_object_keys(self):
+        """Yields the keys of the object at the current position, the caller must consume each value."""
+        self.expect("{")
+        if self.peek() == "}":
+            self.pos += 1
+            return
+        while True:
+            key = self.value()
+            self.expect(":")
+            yield key
+            if self.peek() == ",":
+                self.pos += 1
+            else:
+                self.expect("}")
+                return
+
+    def iter_path(self, path):
+        """Yields the items of the array found at path (a tuple of object keys)."""
+        if not path:
+            yield from self.iter_array()
+            return
+        for key in self.iter_object_keys():
+            if key == path[0] and self.peek() in ("{", "["):
+                yield from self.iter_path(path[1:])
+            else:
+                # Skip any other section
+                self.value()
+
+def parse_match(match):
+    """Turns one JSON match into a Vulnerability, keeping only the reported columns."""
+    artifact = match.get("artifact") or {}
+    vulnerability = match.get("vulnerability") or {}
+    fix = vulnerability.get("fix") or {}
+    return Vulnerability(
+        artifact.get("name") or "",
+        artifact.get("version") or "",
+        ", ".join(fix.get("versions") or []),
+        artifact.get("type") or "",
+        vulnerability.get("id") or "",
+        vulnerability.get("severity") or "Unknown",
+    )
+
+def iter_scan_json(scan_output):
+    """Stream decodes the JSON output.
+    Yields ("headers", JSON_HEADERS) and then ("vulnerability", Vulnerability) for
+    every match under vulnerabilities -> matches."""
+    with open(scan_output, "r", encoding="utf-8") as f:
+        yield "headers", JSON_HEADERS
+        for match in JSONStream(f).iter_path(("vulnerabilities", "matches")):
+            yield "vulnerability", parse_match(match)
+
+def detect_format(scan_output):
+    """Returns "json" if the file holds a JSON document, "table" otherwise."""
+    with open(scan_output, "r", encoding="utf-8") as f:
+        while True:
+            char = f.read(1)
+            if not char.isspace():
+                return "json" if char in ("{", "[") else "table"
+
+def iter_findings(scan_output):
+    """Yields the headers and then the findings of a table or JSON scan output."""
+    if detect_format(scan_output) == "json":
+        return iter_scan_json(scan_output)
+    return iter_scan_table(scan_output)
+
+def open_findings(scan_output):
+    """Reads the headers of the scan output and returns (headers, records), the records
+    being timed as the parse phase while they are consumed. headers is None if there is
+    no Vulnerabilities section."""
+    with metrics.phase("parse", bytes=os.path.getsize(scan_output)):
+        records = iter_findings(scan_output)
+        kind, headers = next(records, (None, None))
+    if kind != "headers":
+        return None, None
+    return headers, metrics.timed("parse", records)
+
+# Severities shown in the summary counters
+SUMMARY_SEVERITIES = ["Critical", "High", "Medium", "Low"]
+
+# Number of rendered rows buffered before each write to the report file
+WRITE_BATCH = 1000
+
+# Counter slots are written as blanks of this width and filled in once all rows are known
+COUNT_WIDTH = 10
+
+_templates = {}
+
+# Template of the paged report, findings are embedded as JSON and rendered by its script
+PAGED_TEMPLATE = "template_paged.html"
+
+def resource_path(name):
+    """Returns the path of a bundled file, also when running as a PyInstaller executable."""
+    base = getattr(sys, "_MEIPASS", os.path.dirname(os.path.abspath(__file__)))
+    return os.path.join(base, name)
+
+def read_template(template_file):
+    """Reads a report template and inlines report.css in place of its STYLE slot,
+    so the reports open without any network access."""
+    with open(template_file, "r", encoding="utf-8") as f:
+        text = f.read()
+    if "<!-- STYLE -->" in text:
+        with open(resource_path("report.css"), "r", encoding="utf-8") as f:
+            text = text.replace("<!-- STYLE -->", f"<style>\n{f.read()}</style>", 1)
+    return text
+
+def load_template(template_file=None):
+    """Loads template.html once and splits it into the parts the renderer streams:
+    the document head with its counter slots, the header cell, the table middle,
+    the row and the tail."""
+    if template_file is None and "table" in _templates:
+        return _templates["table"]
+
+    text = read_template(template_file or resource_path("template.html"))
+
+    blocks = {}
+    for match in re.finditer(r"[ \t]*<!-- (HEADER|ROW) -->\n(.*?)[ \t]*<!-- /\1 -->\n", text, re.DOTALL):
+        blocks[match.group(1)] = match
+
+    header, row = blocks["HEADER"], blocks["ROW"]
+    head = re.split(r"<!-- COUNT:(\w+) -->", text[:header.start()])
+    template = {
+        # Even items are literal text, odd items are severity names
+        "head": head,
+        "header": header.group(2),
+        "middle": text[header.end():row.start()],
+        "row": row.group(2),
+        "tail": text[row.end():],
+    }
+    if template_file is None:
+        _templates["table"] = template
+    return template
+
+def load_paged_template(template_file=None):
+    """Loads template_paged.html once and splits it around its DATA slot,
+    the head keeps its counter slots."""
+    if template_file is None and "paged" in _templates:
+        return _templates["paged"]
+
+    text = read_template(template_file or resource_path(PAGED_TEMPLATE))
+    head, tail = text.split("<!-- DATA -->", 1)
+    template = {"head": re.split(r"<!-- COUNT:(\w+) -->", head), "tail": tail}
+    if template_file is None:
+        _templates["paged"] = template
+    return template
+
+def write_head(parts, out, legend=""):
+    """Writes the document head with blank counter slots, returns their positions."""
+    slots = []
+    for idx, part in enumerate(parts):
+        if idx % 2:
+            slots.append((out.tell(), part))
+            out.write(" " * COUNT_WIDTH)
+        else:
+            out.write(part.replace("<!-- LEGEND -->", legend))
+    return slots
+
+def delta_legend(new, fixed, unchanged):
+    """Legend of a delta report, its counters only count the new findings."""
+    return (f'<p class="delta-legend text-gray-700 mt-2">Changes since the baseline scan, the counters show new findings: '
+            f'<span class="delta-new">New: {new}</span><span class="delta-fixed">Fixed: {fixed}</span>'
+            f'<span>Unchanged: {unchanged}</span></p>')
+
+def fill_counts(out, slots, counts, summary=None):
+    """Patches the severity counters into their slots without touching the rest of the document.
+    When a summary dict is given, it is filled with the severity counts."""
+    severity_count = {severity: counts[Severity.code(severity)] for severity in SUMMARY_SEVERITIES}
+
+    end = out.tell()
+    for position, severity in slots:
+        out.seek(position)
+        out.write(str(severity_count.get(severity, 0)).ljust(COUNT_WIDTH))
+    out.seek(end)
+
+    if summary is not None:
+        summary.update(severity_count)
+
+def flush_rows(pending, out):
+    with metrics.phase("write") as frame:
+        chunk = "".join(pending)
+        out.write(chunk)
+        frame["bytes"] += len(chunk)
+        frame["rows"] += len(pending)
+    pending.clear()
+
+def render_report(headers, records, out, summary=None, legend="", osv=None):
+    """Streams the report into a seekable text file: rows are written as they are read
+    and the severity counters are patched in place at the end.
+    Records of kind "new" or "fixed" (delta reports) are highlighted, fixed ones are not counted.
+    When a summary dict is given, it is filled with the severity counts.
+    With osv (an OsvIndex), the aliases, fixed versions and score are shown under each id."""
+    template = load_template()
+
+    # Count occurrences of each severity code
+    counts = dict.fromkeys(SEVERITY, 0)
+
+    slots = write_head(template["head"], out, legend)
+
+    # Add table headers
+    for header in headers:
+        out.write(template["header"].format(header=escape(header)))
+    out.write(template["middle"])
+
+    row = template["row"]
+    pending = []
+    for kind, record in records:
+        # Increment severity count
+        if record.severity in counts and kind != "fixed":
+            counts[record.severity] += 1
+
+        vulnerability = escape(record.vulnerability.upper())
+        pending.append(row.format(
+            change=DELTA_CLASSES.get(kind, ""),
+            name=escape(record.name),
+            installed=escape(record.installed),
+            fixed_in=escape(record.fixed_in),
+            type=escape(record.type),
+            vulnerability=vulnerability,
+            details=osv_details_html(osv.lookup(record.vulnerability), record.vulnerability) if osv is not None else "",
+            # Get the color for severity
+            color=Severity.get_color(record.severity),
+            severity=record.severity_name,
+        ))
+        if len(pending) >= WRITE_BATCH:
+            flush_rows(pending, out)
+    flush_rows(pending, out)
+    out.write(template["tail"])
+
+    fill_counts(out, slots, counts, summary)
+
+def osv_aliases(details, vulnerability):
+    # The other ids of the vulnerability, the entry found may be one of its aliases
+    vulnerability = vulnerability.upper()
+    return [alias for alias in [details["id"]] + details["aliases"] if alias.upper() != vulnerability]
+
+def osv_details_html(details, vulnerability):
+    if not details:
+        return ""
+    lines = []
+    aliases = osv_aliases(details, vulnerability)
+    if aliases:
+        lines.append("Aliases: " + escape(", ".join(aliases)))
+    if details["fixed"]:
+        lines.append("Fixed: " + escape(", ".join(details["fixed"])))
+    score = score_text(details)
+    if score:
+        lines.append("Score: " + escape(score))
+    return '<div class="osv text-sm text-gray-500">' + "<br>".join(lines) + "</div>" if lines else ""
+
+# Row classes of the delta report, by record kind
+DELTA_CLASSES = {"new": "delta-new", "fixed": "delta-fixed"}
+
+def to_json(value):
+    """Compact JSON that is safe inside a <script> element."""
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":")).replace("</", "<\\/")
+
+def render_paged_report(headers, records, out, summary=None, legend="", osv=None):
+    """Streams the paged report: every finding is written once as a compact JSON array
+    and the inlined script of the template renders, sorts and filters them page by page."""
+    template = load_paged_template()
+
+    counts = dict.fromkeys(SEVERITY, 0)
+
+    slots = write_head(template["head"], out, legend)
+    severities = {code: [info["name"], info["color"]] for code, info in SEVERITY.items()}
+    out.write(f'{{"headers":{to_json(headers)},"severities":{to_json(severities)},"rows":[')
+
+    pending = []
+    separator = ""
+    for kind, record in records:
+        if record.severity in counts and kind != "fixed":
+            counts[record.severity] += 1
+
+        finding = [record.name, record.installed, record.fixed_in, record.type, record.vulnerability.upper(), record.severity]
+        if osv is not None:
+            details = osv.lookup(finding[4])
+            finding.append(kind if kind in DELTA_CLASSES else "")
+            finding.append({"aliases": osv_aliases(details, finding[4]), "fixed": details["fixed"], "score": score_text(details)}
+                           if details else None)
+        elif kind in DELTA_CLASSES:
+            finding.append(kind)
+        pending.append(separator + to_json(finding))
+        separator = ","
+        if len(pending) >= WRITE_BATCH:
+            flush_rows(pending, out)
+    flush_rows(pending, out)
+    out.write("]}")
+    out.write(template["tail"])
+
+    fill_counts(out, slots, counts, summary)
+
+def parse_to_html(scan_output="scan_output.txt", summary=None, paged=False):
+    # Reads the scan output file and converts it to an HTML document string.
+    # When a summary dict is given, it is filled with the severity counts.
+    headers, records = open_findings(scan_output)
+    if headers is None:
+        print("Vulnerabilities section not found.")
         return None
 
-def parse_to_html():
-    # Reads the scan output file and converts it to an HTML table.
-    severity_colors = {
-        "Critical": "bg-pink-500",
-        "High": "bg-red-500",
-        "Medium": "bg-orange-500",
-        "Low": "bg-yellow-500",
+    out = io.StringIO()
+    with metrics.phase("render"):
+        (render_paged_report if paged else render_report)(headers, records, out, summary)
+    return out.getvalue()
+
+# Report formats and the extension of their output file
+REPORT_FORMATS = {"html": ".html", "csv": ".csv", "jsonl": ".jsonl", "xlsx": ".xlsx"}
+
+# Fields of the csv, jsonl and xlsx exports
+EXPORT_FIELDS = ["name", "installed", "fixed_in", "type", "vulnerability", "severity"]
+
+# Columns added to the csv and xlsx exports by the OSV enrichment
+OSV_HEADERS = ["ALIASES", "OSV FIXED", "SCORE"]
+
+def export_path(output_file, report_format):
+    return os.path.splitext(output_file)[0] + REPORT_FORMATS[report_format]
+
+def export_headers(headers, delta=False, osv=None):
+    headers = headers + ["CHANGE"] if delta else list(headers)
+    return headers + OSV_HEADERS if osv is not None else headers
+
+def export_row(kind, record, delta=False, osv=None):
+    row = [record.name, record.installed, record.fixed_in, record.type, record.vulnerability.upper(), record.severity_name]
+    if delta:
+        row.append(kind)
+    if osv is not None:
+        details = osv.lookup(row[4])
+        if details:
+            row.extend([", ".join(osv_aliases(details, row[4])), ", ".join(details["fixed"]), score_text(details)])
+        else:
+            row.extend(["", "", ""])
+    return row
+
+def export_html(headers, records, output_file, summary=None, paged=False, legend="", osv=None):
+    with metrics.phase("render"), open(output_file, "w", encoding="utf-8") as f:
+        (render_paged_report if paged else render_report)(headers, records, f, summary, legend, osv)
+
+def export_csv(headers, records, output_file, delta=False, osv=None):
+    import csv
+
+    with metrics.phase("csv"), open(output_file, "w", newline="", encoding="utf-8", buffering=EXPORT_BUFFER) as f:
+        writer = csv.writer(f)
+        writer.writerow(export_headers(headers, delta, osv))
+        for kind, record in records:
+            writer.writerow(export_row(kind, record, delta, osv))
+
+def export_jsonl(headers, records, output_file, delta=False, osv=None):
+    fields = EXPORT_FIELDS + ["change"] if delta else EXPORT_FIELDS
+    with metrics.phase("jsonl"), open(output_file, "w", encoding="utf-8", buffering=EXPORT_BUFFER) as f:
+        for kind, record in records:
+            item = dict(zip(fields, export_row(kind, record, delta)))
+            if osv is not None:
+                # The whole OSV record, aliases and fixed versions stay lists
+                item["osv"] = osv.lookup(item["vulnerability"])
+            f.write(json.dumps(item, ensure_ascii=False))
+            f.write("\n")
+
+def export_xlsx(headers, records, output_file, delta=False, osv=None):
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Font
+
+    # Write-only workbooks flush the rows to a temp file as they are appended
+    with metrics.phase("xlsx"):
+        wb = Workbook(write_only=True)
+        ws = wb.create_sheet("Vulnerabilities")
+        bold = Font(bold=True)
+        header_cells = []
+        for header in export_headers(headers, delta, osv):
+            cell = WriteOnlyCell(ws, value=header)
+            cell.font = bold
+            header_cells.append(cell)
+        ws.append(header_cells)
+        for kind, record in records:
+            ws.append(export_row(kind, record, delta, osv))
+        wb.save(output_file)
+
+def count_severities(records, summary):
+    """Passes the records through while counting the summary severities."""
+    counts = dict.fromkeys(SEVERITY, 0)
+    for kind, record in records:
+        if record.severity in counts and kind != "fixed":
+            counts[record.severity] += 1
+        yield kind, record
+    summary.update({severity: counts[Severity.code(severity)] for severity in SUMMARY_SEVERITIES})
+
+def export_records(headers, records, output_file, formats=("html",), summary=None, paged=False, legend="", delta=False,
+                   osv=None):
+    """Writes the records in every selected format from a single pass over them. With several
+    formats, the exporters are fed through bounded queues; they share the GIL, so the saving
+    is the single parse, not parallel writing.
+    The file names are output_file with the extension of each format.
+    With osv (an OsvIndex), every format is enriched with the OSV details of the ids.
+    Returns True if every export succeeded."""
+    exporters = {
+        "html": lambda items: export_html(headers, items, export_path(output_file, "html"), summary, paged, legend, osv),
+        "csv": lambda items: export_csv(headers, items, export_path(output_file, "csv"), delta, osv),
+        "jsonl": lambda items: export_jsonl(headers, items, export_path(output_file, "jsonl"), delta, osv),
+        "xlsx": lambda items: export_xlsx(headers, items, export_path(output_file, "xlsx"), delta, osv),
     }
-    
-    # Count occurrences of each severity
-    severity_count = {
-        "Critical": 0,
-        "High": 0,
-        "Medium": 0,
-        "Low": 0
+    formats = list(dict.fromkeys(formats))
+    if summary is not None and "html" not in formats:
+        records = count_severities(records, summary)
+
+    if len(formats) == 1:
+        # No threads needed for a single format
+        try:
+            exporters[formats[0]](records)
+            results = {formats[0]: (None, None)}
+        except Exception as e:
+            # Same as the fan_out path: a failing exporter is reported, not raised
+            results = {formats[0]: (None, e)}
+    else:
+        results = fan_out(records, {report_format: exporters[report_format] for report_format in formats})
+
+    ok = True
+    for report_format in formats:
+        error = results[report_format][1]
+        if error is not None:
+            print(f"Error writing the {report_format.upper()} report: {error}")
+            ok = False
+        else:
+            print(f"{report_format.upper()} report saved to {export_path(output_file, report_format)}")
+    return ok
+
+def scan_metadata(source, app_name=None, sandbox_name=None, version=None):
+    """App/sandbox/version under which the findings of a source are stored,
+    the app defaults to the name of the scanned source."""
+    return {
+        "app_name": app_name or os.path.basename(os.path.normpath(source)),
+        "sandbox_name": sandbox_name,
+        "version": version,
+        "source": source,
     }
-    
-    # Process the file and convert to HTML
-    with open("scan_output.txt", "r") as f:
-        lines = f.readlines()
-    
-    # Join lines into a single string
-    lines_string = ''.join(lines)
 
-    # Regular expression to find "Vulnerabilities" section up until the next header
-    pattern = r"Vulnerabilities\n(.*?)(\n{2,}|No misconfigurations found|No secrets found|Policy Results)"
+def write_report(scan_output="scan_output.txt", output_file="vulnerabilities_report.html", summary=None, paged=False,
+                 store=None, metadata=None, formats=("html",), osv=None):
+    """Parses the scan output and streams the HTML report (and the other selected formats)
+    straight to the output file.
+    With paged, the findings are embedded as JSON and rendered page by page in the browser.
+    With store (a findings history database), the findings are also saved there under
+    the app/sandbox/version of metadata, in the same pass.
+    Returns True if the report was written."""
+    # Stream the scan output, the header row comes first and then one record per row
+    headers, records = open_findings(scan_output)
+    if headers is None:
+        print("Vulnerabilities section not found.")
+        return False
 
-    # Search for the section
-    match = re.search(pattern, lines_string, re.DOTALL)
-    if match:
-        vulnerabilities = match.group(1).strip().split("\n")
-    else:
+    if store:
+        from history import FindingsStore
+        metadata = metadata or scan_metadata(scan_output)
+        records = FindingsStore(store).record_vulnerabilities(metadata, records, metadata.get("source"))
+
+    return export_records(headers, records, output_file, formats, summary, paged, osv=osv)
+
+def write_delta_report(scan_output, baseline, output_file="vulnerabilities_report.html", summary=None, paged=False,
+                       store=None, metadata=None, formats=("html",), osv=None):
+    """Compares the scan output with a baseline scan output (table or JSON) and writes a report
+    of only the new and fixed findings. Findings are matched on (component, version, vulnerability)
+    with a hash index of the baseline while the current scan is streamed.
+    Returns (new, fixed, unchanged), or None if a Vulnerabilities section is missing."""
+    base_headers, base_records = open_findings(baseline)
+    headers, records = open_findings(scan_output)
+    if headers is None or base_headers is None:
         print("Vulnerabilities section not found.")
         return None
 
-    # Start the HTML document with head, including Bootstrap CSS and JS links
-    html = """
-    <!DOCTYPE html>
-    <html lang="en">
-    <head>
-  <meta charset="UTF-8">
-  <meta name="viewport" content="width=device-width, initial-scale=1.0">
-  <script src="https://cdn.tailwindcss.com?plugins=forms,typography,aspect-ratio,line-clamp,container-queries"></script>
-</head>
-<body class="bg-white-100">
-
-  <!-- Title and Subtitle -->
-  <div class="px-4 sm:px-8 mt-8">
-    <h1 class="text-3xl font-bold text-gray-700">Incident Dashboard</h1>
-    <p class="text-gray-500 mt-2">Overview of all incidents and their current status</p>
-  </div>
-
-  <!-- Summary Section -->
-  <div class="grid grid-cols-1 gap-4 px-4 mt-8 sm:grid-cols-4 sm:px-8">
-    <div class="flex items-center bg-white border rounded-sm overflow-hidden shadow">
-      <div class="p-4 bg-pink-500">
-        <svg xmlns="http://www.w3.org/2000/svg" class="h-12 w-12 text-white" fill="none" viewBox="0 0 24 24" stroke="currentColor">
-          <path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M4 7v10c0 2.21 3.582 4 8 4s8-1.79 8-4V7"></path>
-        </svg>
-      </div>
-      <div class="px-4 text-gray-700">
-        <h3 class="text-sm tracking-wider">Critical</h3>
-        <p class="text-3xl">{}</p>
-      </div>
-    </div>
-    <div class="flex items-center bg-white border rounded-sm overflow-hidden shadow">
-      <div class="p-4 bg-red-500">
-        <svg xmlns="http://www.w3.org/2000/svg" class="h-12 w-12 text-white" fill="none" viewBox="0 0 24 24" stroke="currentColor">
-          <path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M8 7v8a2 2 0 002 2h6"></path>
-        </svg>
-      </div>
-      <div class="px-4 text-gray-700">
-        <h3 class="text-sm tracking-wider">High</h3>
-        <p class="text-3xl">{}</p>
-      </div>
-    </div>
-    <div class="flex items-center bg-white border rounded-sm overflow-hidden shadow">
-      <div class="p-4 bg-orange-500">
-        <svg xmlns="http://www.w3.org/2000/svg" class="h-12 w-12 text-white" fill="none" viewBox="0 0 24 24" stroke="currentColor">
-          <path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M13 7a4 4 0 01-8 0"></path>
-        </svg>
-      </div>
-      <div class="px-4 text-gray-700">
-        <h3 class="text-sm tracking-wider">Medium</h3>
-        <p class="text-3xl">{}</p>
-      </div>
-    </div>
-    <div class="flex items-center bg-white border rounded-sm overflow-hidden shadow">
-      <div class="p-4 bg-yellow-500">
-        <svg xmlns="http://www.w3.org/2000/svg" class="h-12 w-12 text-white" fill="none" viewBox="0 0 24 24" stroke="currentColor">
-          <path stroke-linecap="round" stroke-linejoin="round" stroke-width="2" d="M12 4.354a4 4 0 110 5.292"></path>
-        </svg>
-      </div>
-      <div class="px-4 text-gray-700">
-        <h3 class="text-sm tracking-wider">Low</h3>
-        <p class="text-3xl">{}</p>
-      </div>
-    </div>
-  </div>
-
-  <!-- Table Section -->
-  <div class="shadow-lg rounded-lg overflow-hidden mx-4 md:mx-10 mt-8 bg-white">
-    <table class="w-full table-fixed">
-        <thead>
-            <tr class="bg-gray-100">
-    """
+    if store:
+        from history import FindingsStore
+        metadata = metadata or scan_metadata(scan_output)
+        records = FindingsStore(store).record_vulnerabilities(metadata, records, metadata.get("source"))
 
-    # Add table headers
-    headers = vulnerabilities[0].split()
-    html += "".join(f"<th class=\"w-1/6 py-3 px-6 text-left text-gray-600 font-bold uppercase\">{header}</th>" for header in headers) + "</tr>\n"
-    
-    # Close the headers
-    html += """
-            </thead>
-             <tbody class="bg-white">
-    """
-    
-    # Process each row
-    for row in vulnerabilities[1:]:
-        columns = row.split(maxsplit=len(headers) - 1) 
-
-        # Ensure each column has a default value if missing
-        name = columns[0] 
-        installed = columns[1]
-        fixed_in = columns[2] if len(columns) > 5 else ""
-        type_column = columns[3] if len(columns) > 5 else columns[2]
-        vulnerability = columns[4] if len(columns) > 5 else columns[3]
-        severity = columns[-1].strip()
+    with metrics.phase("delta"):
+        new, fixed, unchanged = diff_findings((record for _, record in base_records), (record for _, record in records))
+    print(f"New: {len(new)}, Fixed: {len(fixed)}, Unchanged: {unchanged}")
 
-        # Increment severity count
-        if severity in severity_count:
-            severity_count[severity] += 1
-            
-        # Get the color for severity
-        color = severity_colors.get(severity, "black") 
-        
-        html += "<tr>"
-        html += f"""<td class="py-3 px-6 border-b border-gray-200">{name}</td>
-                    <td class="py-3 px-6 border-b border-gray-200">{installed}</td>
-                    <td class="py-3 px-6 border-b border-gray-200">{fixed_in}</td>
-                    <td class="py-3 px-6 border-b border-gray-200">{type_column}</td>
-                    <td class="py-3 px-6 border-b border-gray-200"><a href="https://vulners.com/osv/OSV:{vulnerability.upper()}" class="font-medium text-blue-600 hover:underline">{vulnerability.upper()}</a></td>
-                    <td class="py-3 px-6 border-b border-gray-200">
-                        <span class="{color} text-white inline-block text-center px-2 py-1 rounded text-md font-semibold">{severity}</span>
-                    </td>
-                """
-        html += "</tr>\n"
-    
-    # Close the table and div
-    html += """
-                </tbody>
-            </table>
-        </div>
-        
-        <div class="mt-8">
-        </div>
-    </body>
-    </html>
-    """
-    
-    html = html.format(severity_count["Critical"], severity_count["High"], severity_count["Medium"], severity_count["Low"])
-    
-    # Beautify HTML for readability using BeautifulSoup
-    soup = BeautifulSoup(html, "html.parser")
-    pretty_html = soup.prettify()
-    return pretty_html
+    delta = [("new", record) for record in new] + [("fixed", record) for record in fixed]
+    legend = delta_legend(len(new), len(fixed), unchanged)
+    if not export_records(headers, delta, output_file, formats, summary, paged, legend, delta=True, osv=osv):
+        return None
+    return new, fixed, unchanged
 
 def save_html(html_content, output_file="vulnerabilities_report.html"):
     """Saves the HTML content to an output file."""
@@ -206,34 +931,245 @@ def save_html(html_content, output_file="vulnerabilities_report.html"):
         f.write(html_content)
     print(f"HTML report saved to {output_file}")
 
-def main():
-    parser = argparse.ArgumentParser(description="Run Veracode scan and convert output to HTML.")
-    parser.add_argument("--type", help="Type of scan (e.g., archive, file, folder)")
-    parser.add_argument("--source", help="Source file or folder for the scan")
-    parser.add_argument("-o", "--output", default="scan_output.txt", help="Temporary output file for scan result")
+def read_manifest(manifest_file):
+    """Reads a manifest file with one source per line, blank lines and # comments are ignored."""
+    with open(manifest_file, "r") as f:
+        return [line.strip() for line in f if line.strip() and not line.strip().startswith("#")]
+
+def report_filename(source):
+    """Builds the per-source report name from the source file or folder name."""
+    name = os.path.basename(os.path.normpath(source)) or "source"
+    name = re.sub(r"[^A-Za-z0-9._-]", "_", name)
+    return f"vulnerabilities_report_{name}.html"
+
+def scan_source(scan_type, source, report_file, cache=None, output_format="table", timeout=None, progress=True, paged=False,
+                store=None, metadata=None, slim=None, formats=("html",), osv=None):
+    """Scans one source into its own temp output file and writes its HTML report.
+    Returns (ScanResult, severity counts), the counts being None if the scan or parsing failed."""
+    fd, output_file = tempfile.mkstemp(prefix="veracli_", suffix=".txt")
+    os.close(fd)
+    try:
+        result = cached_scan(scan_type, source, output_file, cache, output_format, timeout, progress, slim)
+        if not result:
+            return result, None
+
+        summary = {}
+        if not write_report(output_file, report_file, summary, paged, store, metadata, formats, osv):
+            return result, None
+        return result, summary
+    finally:
+        os.remove(output_file)
+
+def scan_sources(scan_type, sources, jobs=4, cache=None, output_format="table", timeout=None, progress=True, paged=False,
+                 store=None, sandbox_name=None, version=None, slim=None, formats=("html",), osv=None):
+    """Runs the scans concurrently, at most `jobs` veracode processes at a time.
+    Returns {source: (report_file, summary, ScanResult)} with summary None for failed scans."""
+    results = {}
+    from concurrent.futures import ThreadPoolExecutor, as_completed
+
+    _cancelled.clear()
+    executor = ThreadPoolExecutor(max_workers=jobs)
+    try:
+        futures = {}
+        used = set()
+        for source in sources:
+            # Sources with the same base name in different folders get a counter suffix
+            report_file = report_filename(source)
+            base, counter = report_file, 2
+            while report_file in used:
+                report_file = base.replace(".html", f"_{counter}.html")
+                counter += 1
+            used.add(report_file)
+            futures[executor.submit(scan_source, scan_type, source, report_file, cache, output_format, timeout, progress, paged,
+                                    store, scan_metadata(source, None, sandbox_name, version), slim, formats, osv)] = (source, report_file)
+
+        for future in as_completed(futures):
+            source, report_file = futures[future]
+            try:
+                result, summary = future.result()
+            except Exception as e:
+                print(f"Error scanning {source}: {e}")
+                result, summary = ScanResult(source, None, error=str(e)), None
+            if summary is None:
+                print(f"Failed to scan {source} ({result.status}).")
+            # The summary links the first selected format
+            results[source] = (export_path(report_file, formats[0]), summary, result)
+    except KeyboardInterrupt:
+        # The worker threads cannot be interrupted, their CLI processes are stopped instead
+        print("Interrupted, stopping the running scans...")
+        executor.shutdown(wait=False, cancel_futures=True)
+        stop_running_scans()
+        raise
+    finally:
+        executor.shutdown(wait=True)
+    return results
+
+def save_summary(sources, results, output_file="vulnerabilities_summary.html"):
+    """Writes a combined summary table with the severity counts of every source."""
+    severities = SUMMARY_SEVERITIES
+    totals = dict.fromkeys(severities, 0)
+
+    rows = []
+    for source in sources:
+        report_file, summary, result = results[source]
+        if summary is None:
+            status = result.status if not result.ok else "No report"
+            cells = "".join("<td>-</td>" for _ in severities)
+            rows.append(f"<tr><td>{escape(source)}</td>{cells}<td>{escape(status)}</td></tr>")
+            continue
+        for severity in severities:
+            totals[severity] += summary[severity]
+        cells = "".join(f"<td>{summary[severity]}</td>" for severity in severities)
+        rows.append(f"<tr><td><a href=\"{escape(report_file)}\">{escape(source)}</a></td>{cells}<td>{result.status}</td></tr>")
+
+    header = "".join(f"<th>{severity}</th>" for severity in severities)
+    total_cells = "".join(f"<th>{totals[severity]}</th>" for severity in severities)
+    html = (
+        "<!DOCTYPE html>\n<html lang=\"en\">\n<head><meta charset=\"UTF-8\"><title>Scan Summary</title></head>\n<body>\n"
+        f"<h1>Scan Summary</h1>\n<table border=\"1\">\n<tr><th>Source</th>{header}<th>Status</th></tr>\n"
+        + "\n".join(rows)
+        + f"\n<tr><th>Total</th>{total_cells}<th></th></tr>\n</table>\n</body>\n</html>\n"
+    )
+    save_html(html, output_file)
 
-    args = parser.parse_args()
+    for severity in severities:
+        print(f"{severity}: {totals[severity]}")
+
+def report(args, scan_output, metadata):
+    """Writes the full report, or the delta report against --baseline. Exits with an error
+    if the report failed or if new findings at or above --fail-on appeared."""
+    if not args.baseline:
+        if not write_report(scan_output, paged=args.paged, store=args.store, metadata=metadata, formats=args.formats,
+                            osv=args.osv_index):
+            sys.exit(1)
+        return
+
+    delta = write_delta_report(scan_output, args.baseline, paged=args.paged, store=args.store, metadata=metadata,
+                               formats=args.formats, osv=args.osv_index)
+    if delta is None:
+        sys.exit(1)
+    failing = new_at_or_above(delta[0], args.fail_on)
+    if failing:
+        print(f"{len(failing)} new findings at or above {args.fail_on} severity.")
+        sys.exit(1)
+
+def run(args, parser):
+    # --format selects the report formats, table/json are still accepted as the Veracode CLI output format
+    selected = args.format or []
+    args.formats = [value for value in selected if value in REPORT_FORMATS] or ["html"]
+    scan_format = args.scan_format or next((value for value in selected if value in ("table", "json")), "table")
+
+    # Offline OSV enrichment, the index is updated from the dump first when one is given
+    args.osv_index = None
+    if args.osv or args.osv_dump:
+        from osv import OsvIndex, build_index
+        index_file = args.osv or default_osv_index()
+        try:
+            if args.osv_dump:
+                with metrics.phase("osv-index"):
+                    print(build_index(args.osv_dump, index_file).summary())
+            args.osv_index = OsvIndex(index_file)
+        except (ValueError, OSError) as e:
+            print(f"Error opening the OSV index: {e}")
+            sys.exit(1)
+
+    # Report from a saved scan output, no scan needed
+    if args.input:
+        metadata = scan_metadata(args.input, args.app_name, args.sandbox_name, args.app_version)
+        report(args, args.input, metadata)
+        return
+
+    sources = list(args.source or [])
+    if args.manifest:
+        sources.extend(read_manifest(args.manifest))
 
     # Check if essential arguments are missing and show help if true
-    if not args.type or not args.source:
+    if not args.type or not sources:
       print("Error: Missing required arguments!")
       parser.print_help()
       sys.exit(1) 
+
+    cache = None
+    if not args.no_cache:
+        cache = ScanCache(args.cache_dir, args.cache_max_size, args.cache_max_age)
+
+    if args.baseline and len(sources) > 1:
+        print("Error: --baseline compares a single source!")
+        sys.exit(1)
+
+    slim = None
+    if args.slim:
+        from archive import load_excludes
+        slim = load_excludes(args.exclude, args.exclude_file, not args.no_default_excludes)
+
+    if len(sources) > 1:
+        try:
+            results = scan_sources(args.type, sources, args.jobs, cache, scan_format, args.timeout, not args.quiet, args.paged,
+                                   args.store, args.sandbox_name, args.app_version, slim, args.formats, args.osv_index)
+        except KeyboardInterrupt:
+            print("Scans interrupted.")
+            sys.exit(130)
+        save_summary(sources, results)
+        if any(summary is None for _, summary, _ in results.values()):
+            sys.exit(1)
+        return
     
     # Run Veracode scan and get the output file path
-    output_file = run_veracode_scan(args.type, args.source, args.output)
-    if not output_file:
-        print("Failed to run Veracode scan.")
-        return
+    result = cached_scan(args.type, sources[0], args.output, cache, scan_format, args.timeout, not args.quiet, slim)
+    if not result:
+        print(f"Failed to run Veracode scan ({result.status}).")
+        sys.exit(1)
 
-    # Parse output file to HTML
-    html_content = parse_to_html()
-
-    # Save HTML content to a file
-    save_html(html_content)
+    # Parse output file and stream the HTML report to a file
+    metadata = scan_metadata(sources[0], args.app_name, args.sandbox_name, args.app_version)
+    report(args, result.output_file, metadata)
 
     # Delete temporary output file
     # os.remove(output_file)
 
+def add_arguments(parser):
+    parser.add_argument("--type", help="Type of scan (e.g., archive, file, folder)")
+    parser.add_argument("--source", nargs="+", help="Source files or folders for the scan")
+    parser.add_argument("--manifest", help="File listing one source per line")
+    parser.add_argument("-j", "--jobs", type=int, default=4, help="Maximum number of concurrent scans")
+    parser.add_argument("-o", "--output", default="scan_output.txt", help="Temporary output file for scan result")
+    parser.add_argument("--timeout", type=float, default=None, help="Cancel a scan after this many seconds")
+    parser.add_argument("-q", "--quiet", action="store_true", help="Do not show the live output of the Veracode CLI")
+    parser.add_argument("--format", action="append", choices=list(REPORT_FORMATS) + ["table", "json"],
+                        help="Report format, repeatable to write several formats from one parse (default: html)")
+    parser.add_argument("--osv", nargs="?", const=default_osv_index(), metavar="INDEX",
+                        help="Add the aliases, fixed versions and score of every id from the offline OSV index (default: %(const)s)")
+    parser.add_argument("--osv-dump", metavar="PATH", help="Build or update the OSV index from this dump (folder or zip of OSV JSON) first, implies --osv")
+    parser.add_argument("--scan-format", choices=["table", "json"], help="Output format requested from the Veracode CLI (default: table)")
+    parser.add_argument("--slim", action="store_true", help="Archive scans: repack the archive without excluded and duplicate files before scanning")
+    parser.add_argument("--exclude", action="append", metavar="PATTERN", help="With --slim, also drop the paths matching this pattern (e.g. '*/fixtures/*'), repeatable")
+    parser.add_argument("--exclude-file", metavar="FILE", help="With --slim, file of exclude patterns, one per line")
+    parser.add_argument("--no-default-excludes", action="store_true", help="With --slim, do not use the default exclude rules (tests, docs, images, source maps...)")
+    parser.add_argument("--paged", action="store_true", help="Embed the findings as JSON and render them page by page, for very large scans")
+    parser.add_argument("--input", help="Build the report from a saved scan output (table or JSON) without scanning")
+    parser.add_argument("--baseline", metavar="FILE", help="Saved scan output (table or JSON) to compare with, the report then only shows new and fixed findings")
+    parser.add_argument("--fail-on", choices=SUMMARY_SEVERITIES, default="Low", help="With --baseline, exit with an error if new findings at or above this severity appeared")
+    parser.add_argument("--store", nargs="?", const=default_history_file(), metavar="DB",
+                        help="Also save the findings to the findings history (default: %(const)s)")
+    parser.add_argument("--app-name", help="App name the findings are stored under (default: source name)")
+    parser.add_argument("--sandbox-name", help="Sandbox name the findings are stored under")
+    parser.add_argument("--app-version", help="Version the findings are stored under")
+    parser.add_argument("--metrics", metavar="FILE", help="Save per-phase timing and resource metrics as JSON")
+    parser.add_argument("--profile", metavar="FILE", help="Save a cProfile dump of the run")
+    parser.add_argument("--no-cache", action="store_true", help="Always run the scan, do not use the scan result cache")
+    parser.add_argument("--cache-dir", default=default_cache_dir(), help="Scan result cache folder")
+    parser.add_argument("--cache-max-size", type=int, default=500, help="Maximum cache size in MB")
+    parser.add_argument("--cache-max-age", type=int, default=7, help="Maximum age of cached results in days")
+    return parser
+
+def execute(args, parser):
+    with instrumented("veracli", args.metrics, args.profile):
+        run(args, parser)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run Veracode scan and convert output to HTML.")
+    add_arguments(parser)
+    execute(parser.parse_args(argv), parser)
+
 if __name__ == "__main__":
     main()
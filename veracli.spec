@@ -5,7 +5,7 @@ a = Analysis(
     ['veracli.py'],
     pathex=[],
     binaries=[],
-    datas=[],
+    datas=[('template.html', '.'), ('template_paged.html', '.'), ('report.css', '.')],
     hiddenimports=[],
     hookspath=[],
     hooksconfig={},
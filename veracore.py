@@ -0,0 +1,465 @@
+import os
+import sys
+import json
+import time
+import hashlib
+import threading
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:
+    # Not available on Windows, peak RSS is then reported as None
+    resource = None
+
+# License risk ratings, keyed by the integer risk_rating of the detailed report
+RISK_RATING = {
+        0: {"name": "Unassessable", "icon": "img/unassessable.png"},
+        2: {"name": "Low", "icon": "img/low.png"},
+        3: {"name": "Medium", "icon": "img/medium.png"},
+        4: {"name": "High", "icon": "img/high.png"},
+        }
+
+# Code used for missing or non numeric risk ratings, sorts after every known rating
+UNKNOWN_RISK = -1
+
+# Vulnerability severities, keyed by an integer code that sorts from most to least severe
+SEVERITY = {
+        4: {"name": "Critical", "color": "bg-pink-500"},
+        3: {"name": "High", "color": "bg-red-500"},
+        2: {"name": "Medium", "color": "bg-orange-500"},
+        1: {"name": "Low", "color": "bg-yellow-500"},
+        0: {"name": "Negligible", "color": "black"},
+        }
+
+UNKNOWN_SEVERITY = -1
+
+_SEVERITY_CODES = {info["name"].lower(): code for code, info in SEVERITY.items()}
+
+def intern(value):
+    """
+    Intern repeated strings (component, license, type...) so every finding shares one copy.
+    """
+    return sys.intern(value) if isinstance(value, str) else value
+
+# Define an Enum for risk_rating
+class RiskRating:
+
+    def code(risk_rating_value):
+        """
+        Convert a risk rating attribute ("4", 4, None...) to its integer code.
+        """
+        if isinstance(risk_rating_value, int):
+            return risk_rating_value
+        if isinstance(risk_rating_value, str) and risk_rating_value.isdigit():
+            return int(risk_rating_value)
+        return UNKNOWN_RISK
+
+    def from_value(risk_rating_value):
+        """
+        Get the risk rating details (name and icon) based on the numeric value.
+        """
+        return RISK_RATING.get(RiskRating.code(risk_rating_value), {"name": "Unknown", "icon": None})
+
+    def to_string(risk_rating_value):
+        """
+        Convert the risk rating value to a human-readable name.
+        """
+        return RiskRating.from_value(risk_rating_value)["name"]
+
+    def get_icon(risk_rating_value):
+        """
+        Get the icon path or image associated with the risk rating value.
+        """
+        return RiskRating.from_value(risk_rating_value)["icon"]
+
+class Severity:
+
+    def code(severity_name):
+        """
+        Convert a severity name ("High", "critical"...) to its integer code.
+        """
+        return _SEVERITY_CODES.get((severity_name or "").lower(), UNKNOWN_SEVERITY)
+
+    def to_string(severity_code):
+        """
+        Convert the severity code to a human-readable name.
+        """
+        return SEVERITY.get(severity_code, {"name": "Unknown"})["name"]
+
+    def get_color(severity_code):
+        """
+        Get the badge color of the severity code.
+        """
+        return SEVERITY.get(severity_code, {"color": "black"})["color"]
+
+class Vulnerability:
+    """
+    One vulnerable package found by a scan.
+    """
+    __slots__ = ("name", "installed", "fixed_in", "type", "vulnerability", "severity")
+
+    def __init__(self, name, installed, fixed_in, type, vulnerability, severity):
+        self.name = intern(name)
+        self.installed = intern(installed)
+        self.fixed_in = intern(fixed_in)
+        self.type = intern(type)
+        self.vulnerability = intern(vulnerability)
+        # Integer severity code, see SEVERITY
+        self.severity = severity if isinstance(severity, int) else Severity.code(severity)
+
+    @property
+    def severity_name(self):
+        return Severity.to_string(self.severity)
+
+    @property
+    def key(self):
+        # Identity of the finding between two scans: component, version and vulnerability
+        return (self.name, self.installed, self.vulnerability)
+
+    def __iter__(self):
+        return iter((self.name, self.installed, self.fixed_in, self.type, self.vulnerability, self.severity))
+
+    def __eq__(self, other):
+        return isinstance(other, Vulnerability) and tuple(self) == tuple(other)
+
+    def __hash__(self):
+        return hash(tuple(self))
+
+    def __repr__(self):
+        return (f"Vulnerability(name={self.name!r}, installed={self.installed!r}, fixed_in={self.fixed_in!r}, "
+                f"type={self.type!r}, vulnerability={self.vulnerability!r}, severity={self.severity_name!r})")
+
+class LicenseFinding:
+    """
+    One license of a component found in the detailed report.
+    """
+    __slots__ = ("file_name", "license_name", "spdx_id", "license_url", "risk_rating")
+
+    def __init__(self, file_name, license_name, spdx_id, license_url, risk_rating):
+        self.file_name = intern(file_name)
+        self.license_name = intern(license_name)
+        self.spdx_id = intern(spdx_id)
+        self.license_url = intern(license_url)
+        # Integer risk code, see RISK_RATING
+        self.risk_rating = RiskRating.code(risk_rating)
+
+    @property
+    def risk_name(self):
+        return RiskRating.to_string(self.risk_rating)
+
+    @property
+    def key(self):
+        # Identity of the finding between two reports: the component file name carries
+        # the component and its version, the license is matched by SPDX id or name
+        return (self.file_name, self.spdx_id or self.license_name)
+
+    def __iter__(self):
+        return iter((self.file_name, self.license_name, self.spdx_id, self.license_url, self.risk_rating))
+
+    def __eq__(self, other):
+        return isinstance(other, LicenseFinding) and tuple(self) == tuple(other)
+
+    def __hash__(self):
+        return hash(tuple(self))
+
+    def __repr__(self):
+        return (f"LicenseFinding(file_name={self.file_name!r}, license_name={self.license_name!r}, "
+                f"spdx_id={self.spdx_id!r}, license_url={self.license_url!r}, risk_rating={self.risk_rating!r})")
+
+def hash_file(path):
+    """
+    sha256 of the file bytes, read in chunks.
+    """
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def index_findings(findings):
+    """
+    Hash index of the findings on their keys, the first finding of a key is kept.
+    """
+    index = {}
+    for finding in findings:
+        index.setdefault(finding.key, finding)
+    return index
+
+def diff_findings(baseline, current):
+    """
+    Match two scans on the finding keys with a hash index of the baseline (the findings,
+    or an index from index_findings), the current findings are streamed.
+    Returns (new, fixed, unchanged) with new and fixed as lists and unchanged as a count,
+    so only the delta is kept in memory.
+    """
+    index = baseline if isinstance(baseline, dict) else index_findings(baseline)
+
+    new = []
+    matched = set()
+    unchanged = 0
+    for finding in current:
+        key = finding.key
+        if key in index:
+            matched.add(key)
+            unchanged += 1
+        else:
+            new.append(finding)
+    fixed = [finding for key, finding in index.items() if key not in matched]
+    return new, fixed, unchanged
+
+def new_at_or_above(new, threshold):
+    """
+    New findings at or above the threshold name: the severity of vulnerabilities
+    ("Critical"...), the risk rating of license findings ("High"...).
+    """
+    severity = Severity.code(threshold)
+    risk = next((code for code, rating in RISK_RATING.items() if rating["name"] == threshold), UNKNOWN_RISK)
+    return [finding for finding in new
+            if (finding.risk_rating >= risk if isinstance(finding, LicenseFinding) else finding.severity >= severity)]
+
+# Write buffer of the csv and jsonl exports
+EXPORT_BUFFER = 1024 * 1024
+
+# Records per batch handed to each exporter, and batches buffered per exporter
+FAN_OUT_BATCH = 1000
+FAN_OUT_DEPTH = 8
+
+class _Feed:
+    """
+    Iterator over the batches a fan_out consumer receives through its bounded queue.
+    """
+    END = object()
+
+    def __init__(self, depth):
+        import queue
+        self.queue = queue.Queue(maxsize=depth)
+        self.finished = False
+
+    def __iter__(self):
+        while True:
+            batch = self.queue.get()
+            if batch is self.END:
+                self.finished = True
+                return
+            yield from batch
+
+    def drain(self):
+        # Consume what is left so the producer never blocks on a consumer that stopped early
+        if not self.finished:
+            for _ in self:
+                pass
+
+def fan_out(records, consumers, batch_size=FAN_OUT_BATCH, depth=FAN_OUT_DEPTH):
+    """
+    Feed one record stream to several consumers, each running in its own thread.
+    A consumer is called with an iterator over its records; the queues between the
+    producer and the consumers are bounded, so the slowest consumer holds the stream
+    back instead of the whole stream being buffered.
+    The stream is read once, but pure Python consumers share the GIL and run one at a
+    time: the wall time is about the sum of the consumers, not the slowest one.
+    Returns {name: (result, error)} with error None when the consumer succeeded.
+    If the record stream raises, its error is the error of every consumer.
+    """
+    results = {}
+    feeds = {name: _Feed(depth) for name in consumers}
+
+    def run(name, consumer, feed):
+        try:
+            results[name] = (consumer(iter(feed)), None)
+        except Exception as e:
+            results[name] = (None, e)
+        finally:
+            feed.drain()
+
+    threads = [threading.Thread(target=run, args=(name, consumer, feeds[name]), daemon=True)
+               for name, consumer in consumers.items()]
+    for thread in threads:
+        thread.start()
+
+    error = None
+    try:
+        batch = []
+        for record in records:
+            batch.append(record)
+            if len(batch) >= batch_size:
+                for feed in feeds.values():
+                    feed.queue.put(batch)
+                batch = []
+        if batch:
+            for feed in feeds.values():
+                feed.queue.put(batch)
+    except Exception as e:
+        # The consumers only saw part of the records, none of their outputs is complete
+        error = e
+    finally:
+        for feed in feeds.values():
+            feed.queue.put(_Feed.END)
+        for thread in threads:
+            thread.join()
+    if error is not None:
+        results = {name: (None, error) for name in consumers}
+    return results
+
+def default_history_file():
+    """
+    Findings history database shared by veracli and verareport (--store).
+    """
+    return os.environ.get("VERACLI_HISTORY", os.path.join(os.path.expanduser("~"), ".veracli", "history.db"))
+
+def default_osv_index():
+    """
+    Offline OSV index used to enrich the vulnerability reports (--osv).
+    """
+    return os.environ.get("VERACLI_OSV_INDEX", os.path.join(os.path.expanduser("~"), ".veracli", "osv.idx"))
+
+def peak_rss_kb():
+    """
+    Peak resident set size of the process in KB, or None if unknown.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux kilobytes
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+def _cpu_seconds():
+    # Own CPU time plus the CPU time of finished child processes (the veracode CLI)
+    times = os.times()
+    return time.process_time() + times.children_user + times.children_system
+
+class Metrics:
+    """
+    Per-phase wall time, CPU time, peak RSS growth, rows and bytes.
+    Nested phases are exclusive: the time of an inner phase is not counted again in the outer one.
+    peak_rss_growth_kb is how much the phase raised the process peak RSS (ru_maxrss when it ends
+    minus when it starts), so a new peak is charged to the phase that caused it. The process peak
+    itself is the top level peak_rss_kb of the saved metrics.
+    """
+
+    def __init__(self):
+        self.phases = {}
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    def reset(self):
+        self.phases = {}
+
+    def _stack(self):
+        if not hasattr(self.local, "stack"):
+            self.local.stack = []
+        return self.local.stack
+
+    def _record(self, name, wall, cpu, rows=0, bytes=0, calls=1, growth=None):
+        with self.lock:
+            phase = self.phases.setdefault(name, {
+                "calls": 0, "wall_seconds": 0.0, "cpu_seconds": 0.0, "peak_rss_growth_kb": None, "rows": 0, "bytes": 0,
+            })
+            phase["calls"] += calls
+            phase["wall_seconds"] += wall
+            phase["cpu_seconds"] += cpu
+            phase["rows"] += rows
+            phase["bytes"] += bytes
+            # Growths add up: each call (or worker) only raised the peak of its own process by that much
+            if growth is not None:
+                phase["peak_rss_growth_kb"] = (phase["peak_rss_growth_kb"] or 0) + growth
+
+    @contextmanager
+    def phase(self, name, rows=0, bytes=0):
+        """
+        Time the block as the given phase, the yielded dict can be used to add rows and bytes.
+        """
+        stack = self._stack()
+        frame = {"rows": rows, "bytes": bytes, "child_wall": 0.0, "child_cpu": 0.0, "child_growth": 0}
+        stack.append(frame)
+        start, cpu_start, peak_start = time.perf_counter(), _cpu_seconds(), peak_rss_kb()
+        try:
+            yield frame
+        finally:
+            wall, cpu = time.perf_counter() - start, _cpu_seconds() - cpu_start
+            growth = peak_rss_kb() - peak_start if peak_start is not None else None
+            stack.pop()
+            if stack:
+                stack[-1]["child_wall"] += wall
+                stack[-1]["child_cpu"] += cpu
+                stack[-1]["child_growth"] += growth or 0
+            self._record(name, wall - frame["child_wall"], cpu - frame["child_cpu"], frame["rows"], frame["bytes"],
+                         growth=growth - frame["child_growth"] if growth is not None else None)
+
+    def timed(self, name, iterable):
+        """
+        Wrap an iterator so the time spent producing the items is recorded as the given phase.
+        The time is accumulated locally and recorded once, so the per-item overhead stays small;
+        the peak RSS is not sampled per item, its growth is charged to the consuming phase.
+        """
+        iterator = iter(iterable)
+        wall = cpu = 0.0
+        rows = 0
+        try:
+            while True:
+                start, cpu_start = time.perf_counter(), time.process_time()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    wall += time.perf_counter() - start
+                    cpu += time.process_time() - cpu_start
+                rows += 1
+                yield item
+        finally:
+            # The consumer's phase must not count this time again
+            stack = self._stack()
+            if stack:
+                stack[-1]["child_wall"] += wall
+                stack[-1]["child_cpu"] += cpu
+            self._record(name, wall, cpu, rows)
+
+    def snapshot(self):
+        with self.lock:
+            return {name: dict(phase) for name, phase in self.phases.items()}
+
+    def merge(self, phases):
+        """
+        Add the phases recorded by a worker process.
+        """
+        for name, phase in phases.items():
+            self._record(name, phase["wall_seconds"], phase["cpu_seconds"], phase["rows"], phase["bytes"],
+                         phase["calls"], phase["peak_rss_growth_kb"])
+
+    def save(self, metrics_file, tool):
+        with open(metrics_file, "w") as f:
+            json.dump({
+                "tool": tool,
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "peak_rss_kb": peak_rss_kb(),
+                "phases": self.snapshot(),
+            }, f, indent=2)
+        print(f"Metrics saved to {metrics_file}")
+
+# Process wide metrics, filled by both tools and saved with --metrics
+metrics = Metrics()
+
+@contextmanager
+def instrumented(tool, metrics_file=None, profile_file=None):
+    """
+    Record the run as the "total" phase, optionally under cProfile, and save the results on exit.
+    """
+    profiler = None
+    if profile_file:
+        import cProfile
+        profiler = cProfile.Profile()
+        profiler.enable()
+    # The total is recorded outside of the phase stack so it stays the whole run time
+    start, cpu_start, peak_start = time.perf_counter(), _cpu_seconds(), peak_rss_kb()
+    try:
+        yield metrics
+    finally:
+        growth = peak_rss_kb() - peak_start if peak_start is not None else None
+        metrics._record("total", time.perf_counter() - start, _cpu_seconds() - cpu_start, growth=growth)
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(profile_file)
+            print(f"Profile saved to {profile_file}")
+        if metrics_file:
+            metrics.save(metrics_file, tool)
@@ -0,0 +1,283 @@
+import os
+import sys
+import json
+import time
+import select
+import signal
+import struct
+import ctypes
+import ctypes.util
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from veracore import metrics, hash_file
+from license import expand_inputs, export_report, run_task
+
+# inotify events of a file that was fully written or moved into the folder
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+
+# Header of struct inotify_event: wd, mask, cookie, len
+INOTIFY_EVENT = struct.Struct("iIII")
+
+# Completion times kept for the recent throughput of the status file
+RECENT_WINDOW = 300
+
+class InotifyWatcher:
+    """
+    Reports the xml files written or moved into a folder, using inotify (Linux).
+    """
+    mode = "inotify"
+
+    def __init__(self, directory):
+        self.directory = directory
+        libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+        self.fd = libc.inotify_init1(os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        if libc.inotify_add_watch(self.fd, os.fsencode(directory), IN_CLOSE_WRITE | IN_MOVED_TO) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, f"inotify_add_watch failed for {directory}")
+
+    def poll(self, timeout):
+        """
+        Wait up to timeout seconds and return the paths of the finished files.
+        """
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return []
+        data = os.read(self.fd, 64 * 1024)
+        paths = []
+        offset = 0
+        while offset < len(data):
+            _, _, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+            offset += INOTIFY_EVENT.size
+            name = data[offset:offset + length].split(b"\0", 1)[0]
+            offset += length
+            if name:
+                paths.append(os.path.join(self.directory, os.fsdecode(name)))
+        return paths
+
+    def close(self):
+        os.close(self.fd)
+
+class PollingWatcher:
+    """
+    Fallback watcher that lists the folder every interval seconds. A file is reported
+    once its size and modification time did not change between two listings.
+    """
+    mode = "polling"
+
+    def __init__(self, directory, interval=2.0):
+        self.directory = directory
+        self.interval = interval
+        self.last_scan = 0.0
+        self.pending = {}
+        # Files already in the folder are queued by the watch loop itself
+        self.reported = {}
+        self.poll(0)
+        self.reported.update(self.pending)
+
+    def poll(self, timeout):
+        wait = min(timeout, max(0.0, self.last_scan + self.interval - time.monotonic()))
+        time.sleep(wait)
+        if time.monotonic() - self.last_scan < self.interval:
+            return []
+        self.last_scan = time.monotonic()
+
+        paths = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not entry.name.lower().endswith(".xml") or not entry.is_file():
+                    continue
+                stat = entry.stat()
+                signature = (stat.st_size, stat.st_mtime_ns)
+                if self.reported.get(entry.path) == signature:
+                    continue
+                if self.pending.get(entry.path) == signature:
+                    paths.append(entry.path)
+                    self.reported[entry.path] = signature
+                self.pending[entry.path] = signature
+        return paths
+
+    def close(self):
+        pass
+
+def make_watcher(directory, interval=2.0, polling=False):
+    """
+    inotify watcher when available, polling otherwise (other platforms, network shares).
+    """
+    if not polling and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(directory)
+        except (OSError, AttributeError) as e:
+            print(f"inotify not available ({e}), polling {directory} every {interval}s")
+    return PollingWatcher(directory, interval)
+
+def warm_worker():
+    """
+    Pool initializer: load openpyxl, PIL and the risk icons once per worker process.
+    """
+    # Ctrl+C and SIGTERM are handled by the watch loop, running reports are finished.
+    # Forked workers would otherwise inherit the loop's SIGTERM handler
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    import openpyxl
+    from license import icon_image_class
+    IconImage = icon_image_class()
+    for risk_rating in (0, 2, 3, 4):
+        IconImage.for_rating(risk_rating)
+
+def load_state(state_file):
+    """
+    Content hashes of the reports already exported, with their output files.
+    """
+    if state_file and os.path.exists(state_file):
+        with open(state_file, "r") as f:
+            return json.load(f)
+    return {}
+
+def write_json(path, data):
+    # Write then rename, readers never see a partial file
+    tmp_file = path + ".tmp"
+    with open(tmp_file, "w") as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_file, path)
+
+class WatchStats:
+    """
+    Counters of the watch loop, written to the status file.
+    """
+
+    def __init__(self, directory, mode):
+        self.directory = directory
+        self.mode = mode
+        self.started = time.time()
+        self.processed = 0
+        self.failed = 0
+        self.skipped = 0
+        self.busy_seconds = 0.0
+        self.recent = deque()
+        self.last_error = None
+
+    def done(self, seconds):
+        self.processed += 1
+        self.busy_seconds += seconds
+        self.recent.append(time.time())
+
+    def status(self, queued, running):
+        now = time.time()
+        while self.recent and self.recent[0] < now - RECENT_WINDOW:
+            self.recent.popleft()
+        uptime = now - self.started
+        return {
+            "directory": self.directory,
+            "mode": self.mode,
+            "pid": os.getpid(),
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.started)),
+            "updated": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(now)),
+            "queued": queued,
+            "running": running,
+            "processed": self.processed,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "reports_per_minute": round(self.processed * 60 / uptime, 2) if uptime else 0.0,
+            "recent_reports_per_minute": round(len(self.recent) * 60 / min(uptime, RECENT_WINDOW), 2) if uptime else 0.0,
+            "mean_report_seconds": round(self.busy_seconds / self.processed, 3) if self.processed else None,
+            "last_error": self.last_error,
+        }
+
+def _stop(signum, frame):
+    raise KeyboardInterrupt
+
+def watch_directory(directory, workers=None, state_file=None, status_file=None, interval=2.0, polling=False,
+                    streaming=False, icons=None, store=None, formats=("xlsx",)):
+    """
+    Export every xml report dropped into the folder until interrupted (Ctrl+C or SIGTERM).
+    Reports are queued and exported by a persistent pool of warm worker processes,
+    reports whose content hash was already exported are skipped.
+    """
+    workers = workers or os.cpu_count() or 1
+    seen = load_state(state_file)
+    watcher = make_watcher(directory, interval, polling)
+    stats = WatchStats(directory, watcher.mode)
+    kwargs = {"streaming": streaming, "icons": icons, "store": store, "formats": formats}
+
+    # Reports already in the folder are processed first
+    queue = deque(expand_inputs([directory]))
+    queued = set(queue)
+    running = {}
+    status_written = 0.0
+
+    def finish(future):
+        path, digest, start = running.pop(future)
+        try:
+            (xml_file, output_files), phases = future.result()
+        except Exception as e:
+            print(f"Error processing {path}: {e}")
+            stats.failed += 1
+            stats.last_error = f"{path}: {e}"
+            return
+        metrics.merge(phases)
+        stats.done(time.monotonic() - start)
+        seen[digest] = {"xml_file": xml_file, "output_files": output_files,
+                        "exported": time.strftime("%Y-%m-%dT%H:%M:%S")}
+        if state_file:
+            write_json(state_file, seen)
+        print(f"License report saved to {', '.join(output_files)}")
+
+    signal.signal(signal.SIGTERM, _stop)
+    print(f"Watching {directory} ({watcher.mode}, {workers} workers), press Ctrl+C to stop.")
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=warm_worker)
+    try:
+        while True:
+            for path in watcher.poll(0.2 if running or queue else interval):
+                if path.lower().endswith(".xml") and path not in queued:
+                    queue.append(path)
+                    queued.add(path)
+
+            # Keep the workers busy without hashing the whole queue up front
+            while queue and len(running) < workers * 2:
+                path = queue.popleft()
+                queued.discard(path)
+                try:
+                    digest = hash_file(path)
+                except OSError as e:
+                    print(f"Error reading {path}: {e}")
+                    continue
+                if digest in seen or any(digest == job[1] for job in running.values()):
+                    print(f"Skipping {path}, already exported")
+                    stats.skipped += 1
+                    continue
+                try:
+                    future = executor.submit(run_task, export_report, path, kwargs)
+                except BrokenProcessPool as e:
+                    # A worker died (out of memory, crash in a native library): its reports
+                    # fail in finish() and a new pool takes over
+                    print(f"Worker pool broken ({e}), starting a new one.")
+                    stats.last_error = f"Worker pool broken: {e}"
+                    for future in list(running):
+                        finish(future)
+                    executor.shutdown(wait=False)
+                    executor = ProcessPoolExecutor(max_workers=workers, initializer=warm_worker)
+                    future = executor.submit(run_task, export_report, path, kwargs)
+                running[future] = (path, digest, time.monotonic())
+
+            for future in [future for future in running if future.done()]:
+                finish(future)
+
+            if status_file and time.monotonic() - status_written >= 1.0:
+                write_json(status_file, stats.status(len(queue), len(running)))
+                status_written = time.monotonic()
+    except KeyboardInterrupt:
+        print("Stopping, waiting for the running reports...")
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+        for future in [future for future in running if not future.cancelled()]:
+            finish(future)
+        watcher.close()
+        if status_file:
+            write_json(status_file, stats.status(len(queue), 0))
+    print(f"Processed {stats.processed} reports, {stats.failed} failed, {stats.skipped} skipped.")
+    return stats